@@ -1,29 +1,68 @@
 \
 # filepath: /Users/weder/Documents/side_projects/wine-shop/backend/app/api/endpoints/rag.py
+import asyncio
+import threading
+from typing import TYPE_CHECKING
+
+import orjson
 from fastapi import APIRouter, Depends, HTTPException
-from app.rag.rag_pipeline import RAGPipeline
+from fastapi.responses import StreamingResponse
 from app.schemas.rag_schemas import SommelierQueryRequest, SommelierQueryResponse
 from app.config import settings # Import the settings instance directly
 from app.rag.config import FAISS_INDEX_PATH, EMBEDDING_MODEL_NAME, LLM_MODEL_NAME
 
+if TYPE_CHECKING:
+    # Importing app.rag.rag_pipeline pulls in langchain, FAISS and sentence-transformers,
+    # which takes seconds. It is imported lazily in get_rag_pipeline() instead.
+    from app.rag.rag_pipeline import RAGPipeline
+
 router = APIRouter()
 
 # Global variable to hold the RAG pipeline instance
 # This is a simple way to cache the pipeline. For production, consider more robust caching.
-rag_pipeline_instance: RAGPipeline | None = None
+rag_pipeline_instance: "RAGPipeline | None" = None
+# Serializes initialization between the startup warmup and early requests
+_rag_init_lock = threading.Lock()
+# Embeddings-only pipeline of the elected index maintainer (see get_maintenance_pipeline)
+_maintenance_pipeline: "RAGPipeline | None" = None
+
+# Warmup state reported by /health/ready/sommelier: "disabled", "pending", "ready" or
+# "failed" (retried in the background). Any successful initialization makes it "ready".
+rag_warmup_status = "disabled"
+rag_warmup_error: str | None = None
+WARMUP_QUERY = "Which wine goes well with raclette?"
 
-async def get_rag_pipeline() -> RAGPipeline:
+async def get_rag_pipeline() -> "RAGPipeline":
     """
     Dependency to get a RAGPipeline instance.
-    Initializes the pipeline if it hasn't been already.
+    Initializes the pipeline (and imports the RAG stack) if it hasn't been already.
+    Initialization is blocking (model and index loading), so it runs in a worker
+    thread and the event loop keeps serving other requests meanwhile.
     """
+    if rag_pipeline_instance is not None and rag_pipeline_instance.qa_chain:
+        return rag_pipeline_instance
+    return await asyncio.to_thread(_initialize_rag_pipeline)
+
+
+def _initialize_rag_pipeline() -> "RAGPipeline":
+    global rag_warmup_status, rag_warmup_error
+    with _rag_init_lock:
+        pipeline = _initialize_rag_pipeline_locked()
+        rag_warmup_status, rag_warmup_error = "ready", None
+        return pipeline
+
+
+def _initialize_rag_pipeline_locked() -> "RAGPipeline":
     global rag_pipeline_instance
     if rag_pipeline_instance is None:
+        from app.rag.rag_pipeline import RAGPipeline
+
         if not settings.OPENAI_API_KEY:
             raise HTTPException(status_code=500, detail="OpenAI API key not configured.")
         
         try:
-            rag_pipeline_instance = RAGPipeline(
+            # The index maintainer's pipeline, if this worker has one, already holds the embedding model
+            rag_pipeline_instance = _maintenance_pipeline or RAGPipeline(
                 faiss_index_path=FAISS_INDEX_PATH,
                 embedding_model_name=EMBEDDING_MODEL_NAME,
                 llm_name=LLM_MODEL_NAME,
@@ -58,10 +97,63 @@ async def get_rag_pipeline() -> RAGPipeline:
             
     return rag_pipeline_instance
 
+
+async def get_maintenance_pipeline() -> "RAGPipeline":
+    """
+    Pipeline used by the elected index maintainer (app/rag/index_maintenance.py)
+    to apply catalog writes. Reuses this worker's serving pipeline if it is
+    loaded; otherwise loads one with just the embedding model, which needs
+    neither an OpenAI key nor the LLM, and never loads the index for queries.
+    """
+    if rag_pipeline_instance is not None:
+        return rag_pipeline_instance
+    return await asyncio.to_thread(_initialize_maintenance_pipeline)
+
+
+def _initialize_maintenance_pipeline() -> "RAGPipeline":
+    global _maintenance_pipeline
+    with _rag_init_lock:
+        if _maintenance_pipeline is None:
+            from app.rag.rag_pipeline import RAGPipeline
+
+            _maintenance_pipeline = RAGPipeline(
+                faiss_index_path=FAISS_INDEX_PATH,
+                embedding_model_name=EMBEDDING_MODEL_NAME,
+                llm_name=LLM_MODEL_NAME,
+                openai_api_key=settings.OPENAI_API_KEY,
+            )
+        return _maintenance_pipeline
+
+
+async def warm_up_rag_pipeline():
+    """
+    Background startup task: loads the embedding model, the FAISS index and the
+    QA chain, then embeds a dummy query so the first real request pays none of it.
+    /health/ready/sommelier reports the worker ready once this has finished.
+    Failures (e.g. no index built yet) are retried with exponential backoff
+    until one succeeds, so the worker recovers without a restart.
+    """
+    global rag_warmup_status, rag_warmup_error
+    rag_warmup_status = "pending"
+    delay = settings.RAG_WARMUP_RETRY_INITIAL_SECONDS
+    while True:
+        try:
+            pipeline = await get_rag_pipeline()
+            await asyncio.to_thread(pipeline.embeddings.embed_query, WARMUP_QUERY)
+            break
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            print(f"RAG warmup failed: {detail}. Retrying in {delay:.0f}s.")
+            rag_warmup_status, rag_warmup_error = "failed", detail
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, settings.RAG_WARMUP_RETRY_MAX_SECONDS)
+    rag_warmup_status, rag_warmup_error = "ready", None
+    print("RAG pipeline warmed up.")
+
 @router.post("/query", response_model=SommelierQueryResponse)
 async def query_sommelier(
     request: SommelierQueryRequest,
-    pipeline: RAGPipeline = Depends(get_rag_pipeline)
+    pipeline = Depends(get_rag_pipeline) # RAGPipeline; not annotated so FastAPI doesn't need the import
 ):
     """
     Accepts a user query and returns the AI Sommelier's response along with source documents.
@@ -84,6 +176,38 @@ async def query_sommelier(
         print(f"Error during RAG query processing: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing query: {e}")
 
+
+def _sse_event(event: str, data) -> bytes:
+    # One Server-Sent Events frame; orjson escapes newlines, so data stays on one line
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data, default=str) + b"\n\n"
+
+
+@router.post("/query/stream")
+async def stream_sommelier_query(
+    request: SommelierQueryRequest,
+    pipeline = Depends(get_rag_pipeline)
+):
+    """
+    Streaming variant of /query, as Server-Sent Events: a `sources` event with the
+    retrieved wines as soon as retrieval is done, then a `token` event per answer
+    chunk as the LLM produces it, then `done` (or `error`, with the message).
+    """
+    if not request.question:
+        raise HTTPException(status_code=400, detail="Query cannot be empty.")
+
+    print(f"Received streaming query: {request.question}")
+
+    async def events():
+        async for event, data in pipeline.query_stream(request.question):
+            yield _sse_event(event, data)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # No caching, and no buffering by a reverse proxy (nginx) that would hold tokens back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # To include this router in your main application:
 # from app.api.endpoints import rag as rag_router
 # app.include_router(rag_router.router, prefix="/api/ai-sommelier", tags=["AI Sommelier"])
@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from fastapi import Query
+from sqlalchemy import func, literal, select, union_all
+
+from app import models
+
+# Columns that can be filtered by exact value and that /wines/facets counts.
+FACET_COLUMNS = {
+    "type": models.Wine.type,
+    "country": models.Wine.country,
+    "region": models.Wine.region,
+    "varietal": models.Wine.varietal,
+    "body_type": models.Wine.body_type,
+}
+
+
+@dataclass
+class WineFilters:
+    """Catalog filters shared by the list and facet endpoints."""
+    type: Optional[List[str]] = None
+    country: Optional[List[str]] = None
+    region: Optional[List[str]] = None
+    varietal: Optional[List[str]] = None
+    body_type: Optional[List[str]] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_vintage: Optional[int] = None
+    max_vintage: Optional[int] = None
+
+    def clauses(self, exclude: Optional[str] = None) -> list:
+        """
+        Builds the WHERE clauses for these filters. `exclude` drops one facet's
+        own filter so its counts show what selecting another value would yield.
+        """
+        clauses = []
+        for facet, column in FACET_COLUMNS.items():
+            values = getattr(self, facet)
+            if values and facet != exclude:
+                clauses.append(column.in_(values))
+        if self.min_price is not None:
+            clauses.append(models.Wine.price >= self.min_price)
+        if self.max_price is not None:
+            clauses.append(models.Wine.price <= self.max_price)
+        if self.min_vintage is not None:
+            clauses.append(models.Wine.vintage >= self.min_vintage)
+        if self.max_vintage is not None:
+            clauses.append(models.Wine.vintage <= self.max_vintage)
+        return clauses
+
+
+def get_wine_filters(
+    type: Optional[List[str]] = Query(None),
+    country: Optional[List[str]] = Query(None),
+    region: Optional[List[str]] = Query(None),
+    varietal: Optional[List[str]] = Query(None),
+    body_type: Optional[List[str]] = Query(None),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_vintage: Optional[int] = Query(None),
+    max_vintage: Optional[int] = Query(None),
+) -> WineFilters:
+    """Dependency that reads the catalog filters from the query string. Repeat a parameter to OR values."""
+    return WineFilters(
+        type=type, country=country, region=region, varietal=varietal, body_type=body_type,
+        min_price=min_price, max_price=max_price, min_vintage=min_vintage, max_vintage=max_vintage,
+    )
+
+
+def facet_counts_query(filters: WineFilters):
+    """
+    Builds one UNION ALL query that returns (facet, value, count) rows for every
+    facet column, so all counts come back in a single database round trip.
+    """
+    per_facet = [
+        select(
+            literal(facet).label("facet"),
+            column.label("value"),
+            func.count().label("count"),
+        )
+        .where(*filters.clauses(exclude=facet))
+        .where(column.is_not(None))
+        .group_by(column)
+        for facet, column in FACET_COLUMNS.items()
+    ]
+    return union_all(*per_facet)
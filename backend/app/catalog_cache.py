@@ -0,0 +1,104 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Optional
+
+from fastapi import Request, Response
+
+from app.config import settings
+
+
+@dataclass
+class CachedResponse:
+    """A serialized catalog response and the headers that go with it."""
+    body: bytes
+    etag: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.monotonic)
+
+    def to_response(self) -> Response:
+        return Response(
+            content=self.body,
+            media_type="application/json",
+            headers={"ETag": self.etag, "Cache-Control": "no-cache", **self.headers},
+        )
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for a serialized body. Identical bytes give identical tags in every worker."""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def version_etag(version: int) -> str:
+    """ETag of a single wine: its version, so it is also what If-Match on PUT/DELETE expects."""
+    return f'"v{version}"'
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match header lists `etag` (or is "*")."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class CatalogCache:
+    """
+    In-process LRU of serialized catalog responses.
+
+    Entries are keyed by (route, params, catalog version). Every catalog write
+    calls `bump()`, which moves to a new version so later reads miss and
+    re-query. The version lives in this process only, so with several uvicorn
+    workers a write made by another worker is picked up when entries expire
+    after `ttl_seconds` (0 disables expiry, which is only safe with one worker).
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+
+    def key(self, route: str, request: Request) -> Hashable:
+        params = tuple(sorted(request.query_params.multi_items()))
+        return (route, params, self.version)
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl_seconds and time.monotonic() - entry.created_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, body: bytes, headers: Optional[Dict[str, str]] = None,
+            etag: Optional[str] = None) -> CachedResponse:
+        """Caches `body` under `key`, tagged with `etag` or else a hash of the body."""
+        entry = CachedResponse(body=body, etag=etag or make_etag(body), headers=headers or {})
+        # A write may have bumped the version while this response was built;
+        # its key is then stale and storing it would only waste a slot.
+        if key[-1] == self.version and self.max_entries > 0:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def bump(self) -> None:
+        """Invalidates every cached response. Call after any catalog write."""
+        self.version += 1
+        self._entries.clear()
+
+
+catalog_cache = CatalogCache(
+    max_entries=settings.CATALOG_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.CATALOG_CACHE_TTL_SECONDS,
+)
@@ -21,6 +21,39 @@ class Settings(BaseSettings):
     STRIPE_SECRET_KEY: Optional[str] = None
     STRIPE_PUBLISHABLE_KEY: Optional[str] = None
 
+    # Database engine profile (see app/database.py). Pool settings are ignored for SQLite.
+    DB_ECHO: bool = False # Logs every statement; only for local debugging
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800 # Seconds before a connection is replaced; -1 disables
+    DB_STATEMENT_CACHE_SIZE: int = 100 # asyncpg prepared statement cache; 0 behind pgbouncer
+
+    # Optional read replica for catalog reads and the RAG indexer
+    READ_REPLICA_URL: Optional[str] = None
+    READ_REPLICA_STALENESS_SECONDS: float = 5.0 # Reads go to the primary this long after a write
+
+    # Load the RAG pipeline in the background at startup; /health/ready/sommelier waits for it
+    RAG_WARMUP_ON_STARTUP: bool = True
+    RAG_WARMUP_RETRY_INITIAL_SECONDS: float = 5.0 # A failed warmup is retried, doubling the wait each time
+    RAG_WARMUP_RETRY_MAX_SECONDS: float = 300.0
+
+    # Incremental FAISS index maintenance (see app/rag/index_maintenance.py)
+    RAG_INDEX_MAINTENANCE: bool = True # Apply catalog writes to the index in the background
+    RAG_INDEX_UPDATE_DELAY_SECONDS: float = 2.0 # Writes within this window are applied as one batch
+    RAG_INDEX_RECONCILE_INTERVAL_SECONDS: float = 3600.0 # Drift check against the wines table; 0 disables
+
+    # Catalog response cache (see app/catalog_cache.py)
+    CATALOG_CACHE_MAX_ENTRIES: int = 1024
+    CATALOG_CACHE_TTL_SECONDS: float = 30.0 # Bounds staleness across workers; 0 = never expire
+
+    # Maximum number of records accepted by one /wines/bulk request
+    BULK_MAX_ITEMS: int = 5000
+
+    # Rows fetched per server-side cursor batch by GET /wines/export
+    EXPORT_BATCH_SIZE: int = 1000
+
     model_config = SettingsConfigDict(env_file=ENV_FILE_PATH, extra='ignore') # Allow and ignore extra fields
 
 settings = Settings()
@@ -1,15 +1,166 @@
+import threading
+import time
+
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings  # Changed to absolute import
 
 DATABASE_URL = settings.DATABASE_URL # Corrected attribute name to uppercase
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long checkouts wait for a free connection,
+    so the pool can be sized from live numbers (see pool_stats()). Opening a
+    new connection is timed separately: a slow connect means a slow database
+    or network, not an undersized pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.connect_errors = 0
+        self.total_connect_seconds = 0.0
+        self.max_connect_seconds = 0.0
+        # Waiting for a free connection is exactly the time spent in the queue's get()
+        queue_get = self._pool.get
+
+        def timed_get(block=True, timeout=None):
+            start = time.perf_counter()
+            try:
+                return queue_get(block, timeout)
+            finally:
+                waited = time.perf_counter() - start
+                with self._stats_lock:
+                    self.total_wait_seconds += waited
+                    self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        self._pool.get = timed_get
+
+    def _do_get(self):
+        try:
+            entry = super()._do_get()
+        except exc.TimeoutError:
+            # Only pool exhaustion; connect and auth errors are counted in _create_connection
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        with self._stats_lock:
+            self.checkouts += 1
+        return entry
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        try:
+            entry = super()._create_connection()
+        except Exception:
+            with self._stats_lock:
+                self.connect_errors += 1
+            raise
+        took = time.perf_counter() - start
+        with self._stats_lock:
+            self.connects += 1
+            self.total_connect_seconds += took
+            self.max_connect_seconds = max(self.max_connect_seconds, took)
+        return entry
+
+
+def engine_options(url: str) -> dict:
+    """Engine keyword arguments for `url`, built from the DB_* settings."""
+    options = {"echo": settings.DB_ECHO}
+    if url.startswith("sqlite"):
+        # SQLite picks its own pool class; the sizing knobs below do not apply.
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if "+asyncpg" in url:
+        # statement_cache_size is asyncpg's own cache, prepared_statement_cache_size
+        # SQLAlchemy's; set both to 0 when running behind pgbouncer in transaction mode.
+        options["connect_args"] = {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
+engine = create_async_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(
     autocommit=False, autoflush=False, bind=engine, class_=AsyncSession
 )
 Base = declarative_base()
 
+# Optional read replica. Without READ_REPLICA_URL every read goes to the primary.
+replica_engine = (
+    create_async_engine(settings.READ_REPLICA_URL, **engine_options(settings.READ_REPLICA_URL))
+    if settings.READ_REPLICA_URL else None
+)
+ReplicaSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=replica_engine or engine, class_=AsyncSession
+)
+
+# When this process last committed a write to the primary (time.monotonic()).
+_last_primary_write = float("-inf")
+
+
+def mark_primary_write() -> None:
+    """Record a committed write so reads stick to the primary until the replica catches up."""
+    global _last_primary_write
+    _last_primary_write = time.monotonic()
+
+
+def read_session_factory() -> sessionmaker:
+    """
+    Session factory for a read that must see recent writes: the replica, unless
+    this process wrote within READ_REPLICA_STALENESS_SECONDS, then the primary.
+    """
+    if replica_engine is None:
+        return SessionLocal
+    if time.monotonic() - _last_primary_write < settings.READ_REPLICA_STALENESS_SECONDS:
+        return SessionLocal
+    return ReplicaSessionLocal
+
 async def get_db():
     async with SessionLocal() as session:
         yield session
+
+async def get_read_db():
+    """Like get_db, but routed to the read replica when one is configured (see read_session_factory)."""
+    async with read_session_factory()() as session:
+        yield session
+
+
+def pool_stats(async_engine=engine) -> dict:
+    """Live connection pool numbers for an engine."""
+    pool = async_engine.pool
+    stats = {"pool_class": type(pool).__name__, "status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    if isinstance(pool, InstrumentedAsyncPool):
+        with pool._stats_lock:
+            stats.update(
+                checkouts=pool.checkouts,
+                timeouts=pool.timeouts,
+                total_wait_seconds=round(pool.total_wait_seconds, 6),
+                avg_wait_seconds=round(pool.total_wait_seconds / pool.checkouts, 6) if pool.checkouts else 0.0,
+                max_wait_seconds=round(pool.max_wait_seconds, 6),
+                connects=pool.connects,
+                connect_errors=pool.connect_errors,
+                avg_connect_seconds=round(pool.total_connect_seconds / pool.connects, 6) if pool.connects else 0.0,
+                max_connect_seconds=round(pool.max_connect_seconds, 6),
+            )
+    return stats
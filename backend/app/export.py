@@ -0,0 +1,79 @@
+import io
+from typing import AsyncIterator, Sequence
+
+import orjson
+from sqlalchemy import Float, Integer
+
+from app import models
+from app.database import read_session_factory
+from app.serialization import wine_rows_select
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+async def _stream_row_batches(fields: Sequence[str], batch_size: int) -> AsyncIterator[Sequence]:
+    """
+    Yields the wines table in id order, `batch_size` rows at a time, from a
+    server-side cursor. The session is opened here rather than taken from
+    get_read_db because it has to stay open for as long as the response streams.
+    """
+    query = (
+        wine_rows_select(fields)
+        .order_by(models.Wine.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async with read_session_factory()() as session:
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            yield partition
+
+
+async def stream_ndjson(fields: Sequence[str], batch_size: int) -> AsyncIterator[bytes]:
+    """One JSON object per line, one chunk per database batch."""
+    keys = tuple(fields)
+    async for rows in _stream_row_batches(fields, batch_size):
+        yield b"".join(orjson.dumps(dict(zip(keys, row))) + b"\n" for row in rows)
+
+
+def _arrow_schema(fields: Sequence[str]):
+    import pyarrow as pa
+
+    def arrow_type(column):
+        if isinstance(column.type, Integer):
+            return pa.int64()
+        if isinstance(column.type, Float):
+            return pa.float64()
+        return pa.string()
+
+    columns = models.Wine.__table__.c
+    return pa.schema([(name, arrow_type(columns[name])) for name in fields])
+
+
+async def stream_arrow(fields: Sequence[str], batch_size: int) -> AsyncIterator[bytes]:
+    """
+    Arrow IPC stream: the schema message first, then one record batch per
+    database batch. Each batch is flushed to the client as soon as it is
+    written, so memory holds at most one batch.
+    """
+    import pyarrow as pa
+
+    schema = _arrow_schema(fields)
+    sink = io.BytesIO()
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield drain()  # Schema message, sent before the first query round trip finishes
+        async for rows in _stream_row_batches(fields, batch_size):
+            columns = list(zip(*rows))
+            writer.write_batch(pa.record_batch(
+                [pa.array(values, type=schema.field(i).type) for i, values in enumerate(columns)],
+                schema=schema,
+            ))
+            yield drain()
+    yield drain()  # End-of-stream marker
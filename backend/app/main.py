@@ -1,28 +1,76 @@
-from fastapi import FastAPI, Depends, HTTPException  # Added HTTPException
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response  # Added HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+import asyncio
 from contextlib import asynccontextmanager
-from typing import List
+from typing import List, Literal, Optional
 
 from app import models # No alias needed for models
 # Import wine-specific schemas from the new file
-from app.wine_app_schemas import Wine, WineCreate, WineUpdate
+from app.wine_app_schemas import (
+    Wine, WineCreate, WineUpdate, WineFacets, WineListItem, WineBulkUpdate, WineIds, BulkItemResult, BulkResult,
+)
 
-from app.database import engine, get_db  # Changed to absolute import from app
+from app.database import engine, replica_engine, get_db, get_read_db, mark_primary_write, pool_stats  # Changed to absolute import from app
+from app.config import settings
+from app.catalog_cache import catalog_cache, etag_matches, not_modified, version_etag
+from app.catalog import FACET_COLUMNS, WineFilters, facet_counts_query, get_wine_filters
+from app.search import search_wines
+from app.export import ARROW_MEDIA_TYPE, NDJSON_MEDIA_TYPE, stream_arrow, stream_ndjson
+from app.serialization import (
+    LIST_DEFAULT_FIELDS,
+    WINE_FIELD_NAMES,
+    parse_fields,
+    wine_fields_list_adapter,
+    wine_fields_model,
+    wine_fields_row_encoder,
+    wine_rows_select,
+)
+from app.metrics import PrometheusMiddleware, instrument_engine, render_metrics
+from app.pagination import (
+    SORT_OPTIONS, InvalidCursorError, apply_cursor, apply_sort, next_cursor_for, null_block_fill, parse_sort,
+)
 
 # Add this import for CORS
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 
-# Import and include the RAG API router
+# Import and include the RAG API router. The router module itself is light; the
+# langchain / FAISS / sentence-transformers stack is imported on first use.
 from app.api.endpoints import rag as rag_router # Corrected import alias
+from app.rag.config import FAISS_INDEX_PATH
+from app.rag.index_maintenance import IndexMaintainer
 
+# Applies catalog writes to the FAISS index in the background (started in lifespan)
+index_maintainer = IndexMaintainer(rag_router.get_maintenance_pipeline, FAISS_INDEX_PATH)
 
-# Create tables on startup
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+
+# Create all database tables if they don't exist
+# This is useful for development but consider Alembic for production migrations
+async def create_tables():
     async with engine.begin() as conn:
+        # await conn.run_sync(Base.metadata.drop_all) # Optional: drop tables first
         await conn.run_sync(models.Base.metadata.create_all)
+
+
+# Startup/shutdown. Schema creation runs here once; the RAG stack is loaded by a
+# background task so the worker starts serving the catalog right away.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print("Application startup: Creating database tables if they don't exist...")
+    await create_tables()
+    print("Database tables checked/created.")
+    warmup_task = None
+    if settings.RAG_WARMUP_ON_STARTUP:
+        print("Warming up the RAG pipeline in the background...")
+        warmup_task = asyncio.create_task(rag_router.warm_up_rag_pipeline())
+    if settings.RAG_INDEX_MAINTENANCE:
+        index_maintainer.start()
     yield
+    await index_maintainer.stop()
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
 
 
 app = FastAPI(
@@ -48,8 +96,15 @@ app.add_middleware(
     allow_credentials=True, # Allows cookies to be included in requests
     allow_methods=["*"],    # Allows all methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],    # Allows all headers
+    expose_headers=["X-Next-Cursor", "ETag"], # Lets the browser read the pagination cursor and cache tag
 )
 
+# Request latency / in-flight metrics and DB statement timings, served at /metrics
+app.add_middleware(PrometheusMiddleware)
+instrument_engine(engine, "primary")
+if replica_engine is not None:
+    instrument_engine(replica_engine, "replica")
+
 
 @app.get("/")
 async def root():
@@ -57,13 +112,290 @@ async def root():
 
 
 # Example: Get all wines
-@app.get("/wines/", response_model=list[Wine]) # Use aliased schema
+@app.get("/wines/", response_model=list[WineListItem]) # Documents the trimmed default shape
 async def read_wines(
-    skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+    sort: str = Query("id", description=f"One of: {', '.join(SORT_OPTIONS)}"),
+    after: Optional[str] = Query(None, description="Opaque cursor from a previous X-Next-Cursor header"),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return, or 'all'. Defaults to every field except description and food_pairing."
+    ),
+    fast: bool = Query(False, description="Encode plain rows with orjson, skipping Pydantic"),
+    filters: WineFilters = Depends(get_wine_filters),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Lists wines. Old clients keep paging with skip/limit; new clients pass the
+    X-Next-Cursor header of the previous page as `after`, which seeks through
+    the (sort_key, id) index instead of scanning every skipped row.
+    Only the requested columns are selected; the large Text columns are left
+    out unless `fields` asks for them. The id and the sort key are always included.
+    Responses are cached per query string until the next catalog write and
+    carry an ETag, so clients can revalidate with If-None-Match.
+    """
+    cache_key = catalog_cache.key("read_wines", request)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return not_modified(cached.etag) if etag_matches(request, cached.etag) else cached.to_response()
+
+    if sort not in SORT_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort. Use one of: {', '.join(SORT_OPTIONS)}")
+    if after and skip:
+        raise HTTPException(status_code=400, detail="Use either 'skip' or 'after', not both.")
+
+    try:
+        columns = parse_fields(fields, default=LIST_DEFAULT_FIELDS, always=("id", parse_sort(sort)[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    sorted_query = apply_sort(wine_rows_select(columns).where(*filters.clauses()), sort)
+    try:
+        query = apply_cursor(sorted_query, sort, after)
+        fill_query = null_block_fill(sorted_query, sort, after)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if skip:
+        query = query.offset(skip)
+
+    result = await db.execute(query.limit(limit))
+    wines = result.all()
+    if fill_query is not None and len(wines) < limit:
+        # The seek ran off the end of the non-NULL sort keys; the wines without one come next
+        result = await db.execute(fill_query.limit(limit - len(wines)))
+        wines += result.all()
+    if fast:
+        body = wine_fields_row_encoder(columns)(wines)
+    else:
+        adapter = wine_fields_list_adapter(columns)
+        body = adapter.dump_json(adapter.validate_python(wines, from_attributes=True))
+
+    headers = {}
+    next_cursor = next_cursor_for(wines, sort, limit)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    entry = catalog_cache.put(cache_key, body, headers)
+    return not_modified(entry.etag) if etag_matches(request, entry.etag) else entry.to_response()
+
+
+@app.get("/wines/facets", response_model=WineFacets)
+async def read_wine_facets(
+    filters: WineFilters = Depends(get_wine_filters), db: AsyncSession = Depends(get_read_db)
 ):
-    result = await db.execute(select(models.Wine).offset(skip).limit(limit))
-    wines = result.scalars().all()
-    return wines
+    """
+    Returns how many wines carry each type, country, region, varietal and body
+    type under the current filters. A facet's own filter is left out of its
+    counts so the browse page can show the alternatives next to a selection.
+    """
+    result = await db.execute(facet_counts_query(filters))
+    facets = {facet: [] for facet in FACET_COLUMNS}
+    for facet, value, count in result.all():
+        facets[facet].append({"value": value, "count": count})
+    for counts in facets.values():
+        counts.sort(key=lambda c: (-c["count"], c["value"]))
+    return {"facets": facets}
+
+
+@app.get("/wines/search", response_model=list[Wine])
+async def search_catalog(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Full-text search over name, producer, varietal, description and food pairing,
+    best matches first. Tolerates typos in wine names via trigram similarity.
+    """
+    return await search_wines(db, q, limit)
+
+
+@app.get("/wines/export")
+async def export_wines(
+    format: Literal["ndjson", "arrow"] = Query("ndjson"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to export. Defaults to all fields."),
+):
+    """
+    Streams the whole catalog in id order as NDJSON or as an Arrow IPC stream.
+    Rows come from a server-side cursor in batches of EXPORT_BATCH_SIZE, so
+    memory stays flat however large the table is.
+    """
+    try:
+        columns = parse_fields(fields, default=WINE_FIELD_NAMES)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "arrow":
+        try:
+            import pyarrow  # noqa: F401 - only needed for this format
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Arrow export requires the 'pyarrow' package.")
+        stream, media_type, extension = stream_arrow(columns, settings.EXPORT_BATCH_SIZE), ARROW_MEDIA_TYPE, "arrows"
+    else:
+        stream, media_type, extension = stream_ndjson(columns, settings.EXPORT_BATCH_SIZE), NDJSON_MEDIA_TYPE, "ndjson"
+
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="wines.{extension}"'},
+    )
+
+
+def _catalog_written(wine_ids):
+    """Bookkeeping after a committed write to the given wines."""
+    catalog_cache.bump()
+    mark_primary_write()
+    index_maintainer.enqueue(wine_ids)
+
+
+def _check_bulk_size(count: int):
+    if count == 0:
+        raise HTTPException(status_code=400, detail="No records given.")
+    if count > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {settings.BULK_MAX_ITEMS} records per bulk request."
+        )
+
+
+def _upsert_on_product_url(db: AsyncSession):
+    """INSERT ... ON CONFLICT (product_url) DO UPDATE for the session's database; updates bump the version."""
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(models.Wine)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(models.Wine)
+    else:
+        raise HTTPException(status_code=501, detail=f"Bulk upsert is not supported on {dialect}.")
+    return stmt.on_conflict_do_update(
+        index_elements=[models.Wine.product_url],
+        set_={**{name: stmt.excluded[name] for name in WineCreate.model_fields}, "version": models.Wine.version + 1},
+    )
+
+
+def _duplicate(index: int, first_index: int, key: str) -> BulkItemResult:
+    return BulkItemResult(index=index, status="error", detail=f"Duplicate {key}; record {first_index} has the same.")
+
+
+@app.post("/wines/bulk", response_model=BulkResult, status_code=201)
+async def bulk_upsert_wines(wines: List[WineCreate], db: AsyncSession = Depends(get_db)):
+    """
+    Creates or updates many wines in one transaction. Records with a product_url
+    are upserted on it (multi-row INSERT ... ON CONFLICT (product_url) DO UPDATE),
+    so re-importing a feed updates the wines it created before instead of
+    duplicating them; records without one are always inserted. Every record gets
+    a result: created or updated with its id, or error if its product_url
+    already appeared earlier in the request.
+    """
+    _check_bulk_size(len(wines))
+    results: List[Optional[BulkItemResult]] = [None] * len(wines)
+    first_index = {} # product_url -> first record carrying it
+    upserts, inserts = [], [] # (index, values)
+    for index, wine in enumerate(wines):
+        values = wine.model_dump()
+        url = values["product_url"]
+        if url is None:
+            inserts.append((index, values))
+        elif url in first_index:
+            results[index] = _duplicate(index, first_index[url], "product_url")
+        else:
+            first_index[url] = index
+            upserts.append((index, values))
+
+    # Known product_urls tell an update from a create; the upsert itself stays one statement
+    existing = set()
+    if first_index:
+        rows = await db.execute(select(models.Wine.product_url).where(models.Wine.product_url.in_(first_index)))
+        existing = set(rows.scalars().all())
+
+    if upserts:
+        # Ids are matched back by product_url (unique within the batch): SQLAlchemy's
+        # sort_by_parameter_order does not work with ON CONFLICT on Postgres
+        result = await db.execute(
+            _upsert_on_product_url(db).returning(models.Wine.id, models.Wine.product_url),
+            [values for _, values in upserts],
+        )
+        ids_by_url = {url: wine_id for wine_id, url in result.all()}
+        for index, values in upserts:
+            url = values["product_url"]
+            results[index] = BulkItemResult(
+                index=index, id=ids_by_url[url], status="updated" if url in existing else "created"
+            )
+    if inserts:
+        result = await db.execute(
+            insert(models.Wine).returning(models.Wine.id, sort_by_parameter_order=True),
+            [values for _, values in inserts],
+        )
+        for (index, _), wine_id in zip(inserts, result.scalars().all()):
+            results[index] = BulkItemResult(index=index, id=wine_id, status="created")
+    await db.commit()
+
+    ids = [item.id for item in results if item.id is not None]
+    _catalog_written(ids)
+    return {"count": len(ids), "results": results}
+
+
+@app.put("/wines/bulk", response_model=BulkResult)
+async def bulk_update_wines(wines: List[WineBulkUpdate], db: AsyncSession = Depends(get_db)):
+    """
+    Applies partial updates to many wines in one transaction. Only the fields set
+    on each record change. Ids that don't exist come back as not_found, repeated
+    ids as error; the other records are still applied.
+    """
+    _check_bulk_size(len(wines))
+    results: List[Optional[BulkItemResult]] = [None] * len(wines)
+    first_index = {} # id -> first record carrying it
+    for index, wine in enumerate(wines):
+        if wine.id in first_index:
+            results[index] = _duplicate(index, first_index[wine.id], "id")
+        else:
+            first_index[wine.id] = index
+
+    existing = await db.execute(select(models.Wine.id).where(models.Wine.id.in_(first_index)))
+    found = set(existing.scalars().all())
+    for wine_id, index in first_index.items():
+        status = "updated" if wine_id in found else "not_found"
+        results[index] = BulkItemResult(index=index, id=wine_id, status=status)
+
+    ids = [wine_id for wine_id in first_index if wine_id in found]
+    if ids:
+        # ORM bulk UPDATE by primary key: one executemany per distinct set of changed columns
+        await db.execute(
+            update(models.Wine), [wines[first_index[wine_id]].model_dump(exclude_unset=True) for wine_id in ids]
+        )
+        await db.execute(
+            update(models.Wine).where(models.Wine.id.in_(ids)).values(version=models.Wine.version + 1)
+        )
+        await db.commit()
+        _catalog_written(ids)
+    return {"count": len(ids), "results": results}
+
+
+@app.delete("/wines/bulk", response_model=BulkResult)
+async def bulk_delete_wines(payload: WineIds, db: AsyncSession = Depends(get_db)):
+    """
+    Deletes many wines with a single DELETE ... RETURNING. Ids that don't exist
+    come back as not_found, repeated ids as error; the others are deleted.
+    """
+    _check_bulk_size(len(payload.ids))
+    results: List[Optional[BulkItemResult]] = [None] * len(payload.ids)
+    first_index = {} # id -> first position carrying it
+    for index, wine_id in enumerate(payload.ids):
+        if wine_id in first_index:
+            results[index] = _duplicate(index, first_index[wine_id], "id")
+        else:
+            first_index[wine_id] = index
+
+    result = await db.execute(
+        delete(models.Wine).where(models.Wine.id.in_(first_index)).returning(models.Wine.id)
+    )
+    deleted = set(result.scalars().all())
+    await db.commit()
+    for wine_id, index in first_index.items():
+        status = "deleted" if wine_id in deleted else "not_found"
+        results[index] = BulkItemResult(index=index, id=wine_id, status=status)
+    if deleted:
+        _catalog_written(deleted)
+    return {"count": len(deleted), "results": results}
 
 
 # Example: Create a new wine
@@ -73,6 +405,7 @@ async def create_wine(wine: WineCreate, db: AsyncSession = Depends(get_db)): # U
     db.add(db_wine)
     await db.commit()
     await db.refresh(db_wine)
+    _catalog_written([db_wine.id])
     return db_wine
 
 
@@ -80,38 +413,126 @@ async def create_wine(wine: WineCreate, db: AsyncSession = Depends(get_db)): # U
 # and for other models as you define them.
 
 @app.get("/wines/{wine_id}", response_model=Wine) # Use aliased schema
-async def read_wine(wine_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Wine).filter(models.Wine.id == wine_id))
-    db_wine = result.scalars().first()
+async def read_wine(
+    wine_id: int,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return. Defaults to all fields."),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Returns one wine. Its ETag is derived from the wine's version ("v3"), so the
+    same tag works for If-None-Match here and for If-Match on PUT/DELETE.
+    The id and version are always included.
+    """
+    cache_key = catalog_cache.key(f"read_wine:{wine_id}", request)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return not_modified(cached.etag) if etag_matches(request, cached.etag) else cached.to_response()
+
+    try:
+        columns = parse_fields(fields, default=WINE_FIELD_NAMES, always=("id", "version"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    result = await db.execute(wine_rows_select(columns).filter(models.Wine.id == wine_id))
+    db_wine = result.first()
     if db_wine is None:
         raise HTTPException(status_code=404, detail="Wine not found")
-    return db_wine
 
-@app.put("/wines/{wine_id}", response_model=Wine) # Use aliased schema
-async def update_wine(wine_id: int, wine: WineUpdate, db: AsyncSession = Depends(get_db)): # Use app_schemas
-    result = await db.execute(select(models.Wine).filter(models.Wine.id == wine_id))
-    db_wine = result.scalars().first()
-    if db_wine is None:
-        raise HTTPException(status_code=404, detail="Wine not found")
+    body = wine_fields_model(columns).model_validate(db_wine).model_dump_json().encode()
+    entry = catalog_cache.put(cache_key, body, etag=version_etag(db_wine.version))
+    return not_modified(entry.etag) if etag_matches(request, entry.etag) else entry.to_response()
+
+def _parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """
+    Reads the expected wine version from an If-Match header: the ETag of
+    GET /wines/{id} ("\"v3\""), a bare version ("3" or "\"3\"") or "*".
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    if tag.startswith("v"):
+        tag = tag[1:]
+    try:
+        return int(tag)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be the wine's ETag or version number.")
+
+
+async def _raise_write_miss(db: AsyncSession, wine_id: int, expected_version: Optional[int]):
+    """
+    Turns an UPDATE/DELETE that matched no row into the right error. Only the
+    conditional (If-Match) case needs an extra query to tell 404 from 412.
+    """
+    await db.rollback()
+    if expected_version is not None:
+        exists = await db.execute(select(models.Wine.id).where(models.Wine.id == wine_id))
+        if exists.first() is not None:
+            raise HTTPException(status_code=412, detail="Wine was modified by another request (version mismatch).")
+    raise HTTPException(status_code=404, detail="Wine not found")
 
-    update_data = wine.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_wine, key, value)
 
+@app.put("/wines/{wine_id}", response_model=Wine) # Use aliased schema
+async def update_wine(
+    wine_id: int,
+    wine: WineUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None, description="Only update if the wine is still at this version (ETag)"),
+    db: AsyncSession = Depends(get_db),
+): # Use app_schemas
+    """
+    Updates a wine with a single UPDATE ... RETURNING; no read before the write.
+    Every update increments the wine's `version`; send the ETag (or the
+    version) back in If-Match to get a 412 instead of overwriting a concurrent
+    change. The response carries the new ETag.
+    """
+    expected_version = _parse_if_match(if_match)
+    stmt = (
+        update(models.Wine)
+        .where(models.Wine.id == wine_id)
+        .values(**wine.model_dump(exclude_unset=True), version=models.Wine.version + 1)
+        .returning(models.Wine)
+        .execution_options(synchronize_session=False)
+    )
+    if expected_version is not None:
+        stmt = stmt.where(models.Wine.version == expected_version)
+
+    db_wine = (await db.execute(stmt)).scalars().first()
+    if db_wine is None:
+        await _raise_write_miss(db, wine_id, expected_version)
+    updated = Wine.model_validate(db_wine) # Serialize before commit expires the instance
     await db.commit()
-    await db.refresh(db_wine)
-    return db_wine
+    _catalog_written([wine_id])
+    response.headers["ETag"] = version_etag(updated.version)
+    return updated
 
 @app.delete("/wines/{wine_id}", response_model=Wine) # Use aliased schema
-async def delete_wine(wine_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Wine).filter(models.Wine.id == wine_id))
-    db_wine = result.scalars().first()
+async def delete_wine(
+    wine_id: int,
+    if_match: Optional[str] = Header(None, description="Only delete if the wine is still at this version (ETag)"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Deletes a wine with a single DELETE ... RETURNING and returns the deleted row."""
+    expected_version = _parse_if_match(if_match)
+    stmt = (
+        delete(models.Wine)
+        .where(models.Wine.id == wine_id)
+        .returning(models.Wine)
+        .execution_options(synchronize_session=False)
+    )
+    if expected_version is not None:
+        stmt = stmt.where(models.Wine.version == expected_version)
+
+    db_wine = (await db.execute(stmt)).scalars().first()
     if db_wine is None:
-        raise HTTPException(status_code=404, detail="Wine not found")
-
-    await db.delete(db_wine)
+        await _raise_write_miss(db, wine_id, expected_version)
+    deleted = Wine.model_validate(db_wine)
     await db.commit()
-    return db_wine
+    _catalog_written([wine_id])
+    return deleted
 
 # Health check endpoint
 @app.get("/health")
@@ -119,28 +540,67 @@ async def health_check():
     return {"status": "healthy"}
 
 
-# Create all database tables if they don't exist
-# This is useful for development but consider Alembic for production migrations
-async def create_tables():
-    async with engine.begin() as conn:
-        # await conn.run_sync(Base.metadata.drop_all) # Optional: drop tables first
-        await conn.run_sync(models.Base.metadata.create_all)
-
-
-@app.on_event("startup")
-async def startup_event():
-    print("Application startup: Creating database tables if they don't exist...")
-    await create_tables()
-    print("Database tables checked/created.")
-    # You could also pre-load the RAG pipeline's vector store here if desired
-    # from app.api.endpoints.rag import rag_pipeline_instance
-    # if not rag_pipeline_instance.vector_store:
-    #     print("Pre-loading FAISS index at startup...")
-    #     rag_pipeline_instance.load_vector_store()
-    #     if rag_pipeline_instance.vector_store:
-    #         print("FAISS index pre-loaded.")
-    #     else:
-    #         print("Warning: FAISS index could not be pre-loaded at startup.")
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and the event loop is responsive."""
+    return {"status": "alive"}
+
+
+def _rag_checks() -> dict:
+    checks = {"rag": rag_router.rag_warmup_status}
+    if rag_router.rag_warmup_error:
+        checks["rag_error"] = rag_router.rag_warmup_error
+    return checks
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe for the catalog: 503 unless the database answers. The RAG
+    state is reported but never fails this probe; a worker without a warm
+    sommelier still serves the catalog. Route sommelier traffic on
+    /health/ready/sommelier instead.
+    """
+    checks = {}
+    try:
+        async with engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(select(1)), timeout=2.0)
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = f"error: {e}"
+    checks.update(_rag_checks())
+
+    ready = checks["database"] == "ok"
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "checks": checks})
+
+
+@app.get("/health/ready/sommelier")
+async def sommelier_readiness():
+    """
+    Readiness probe for /api/ai-sommelier: 503 until the RAG pipeline is loaded
+    and warmed (or warmup is disabled), so the load balancer only sends sommelier
+    traffic to warm workers. Failed warmups are retried in the background.
+    """
+    checks = _rag_checks()
+    ready = checks["rag"] in ("ready", "disabled")
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "checks": checks})
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of request, database and RAG stage metrics."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+# Internal: not in the public schema; block /internal/ at the edge proxy.
+@app.get("/internal/db-pool", include_in_schema=False)
+async def db_pool_stats():
+    """Live pool numbers (checked-out connections, overflow, checkout wait times) for sizing the pool."""
+    stats = {"primary": pool_stats(engine)}
+    if replica_engine is not None:
+        stats["replica"] = pool_stats(replica_engine)
+    return stats
 
 
 # Include the new RAG router
@@ -0,0 +1,143 @@
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from sqlalchemy import event
+from starlette.routing import Match
+
+# Exposed at /metrics in Prometheus text format. With several uvicorn workers,
+# set PROMETHEUS_MULTIPROC_DIR so prometheus_client aggregates across processes.
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled, by route template.",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Database statement latency, measured around cursor execution.",
+    ["engine", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+RAG_STAGE_LATENCY = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in each stage of a sommelier query.",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+RAG_QUERIES = Counter("rag_queries_total", "Sommelier queries by outcome.", ["outcome"])
+RAG_QUERY_EMBEDDING_CACHE = Counter(
+    "rag_query_embedding_cache_total", "Query embedding cache lookups by result (hit or miss).", ["result"]
+)
+RAG_QUERY_EMBEDDING_SECONDS_SAVED = Counter(
+    "rag_query_embedding_seconds_saved_total",
+    "Embedding time avoided by query embedding cache hits, at the measured cost of each cached embedding.",
+)
+RAG_ANSWER_CACHE = Counter(
+    "rag_answer_cache_total", "Semantic answer cache lookups by result (hit or miss).", ["result"]
+)
+RAG_ANSWER_CACHE_SECONDS_SAVED = Counter(
+    "rag_answer_cache_seconds_saved_total",
+    "Retrieval and LLM time avoided by semantic answer cache hits, at the measured cost of each cached answer.",
+)
+RAG_QUERIES_COALESCED = Counter(
+    "rag_queries_coalesced_total",
+    "Sommelier queries answered by joining an identical query already in flight instead of running their own.",
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _route_template(scope) -> str:
+    """The path template of the route that will handle `scope` (e.g. /wines/{wine_id})."""
+    app = scope.get("app")
+    if app is None:
+        return UNMATCHED_ROUTE
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+
+class PrometheusMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency and in-flight requests.
+    Routes are labelled by template, never by raw path, to bound cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _route_template(scope)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_LATENCY.labels(method, route, str(status_code)).observe(time.perf_counter() - start)
+            in_flight.dec()
+
+
+def instrument_engine(async_engine, name: str) -> None:
+    """Times every statement run on `async_engine` via SQLAlchemy cursor events."""
+    sync_engine = async_engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get("query_start_times")
+        if not start_times:
+            return
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        DB_QUERY_LATENCY.labels(name, operation).observe(time.perf_counter() - start_times.pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_times"):
+            conn.info["query_start_times"].pop()
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Records the duration of a RAG stage (embedding, faiss_search, llm, ...)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        RAG_STAGE_LATENCY.labels(stage).observe(time.perf_counter() - start)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
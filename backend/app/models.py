@@ -1,6 +1,27 @@
-from sqlalchemy import Column, Integer, String, Float, Text
+from sqlalchemy import Column, Integer, String, Float, Text, Index, DDL, column, event, func, inspect, literal_column, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.dialects import postgresql  # Also registers the typed to_tsvector()/websearch_to_tsquery() functions
 from app.database import Base # Changed to absolute import
 
+
+def _weighted_tsvector(column, weight: str):
+    return func.setweight(
+        func.to_tsvector(literal_column("'english'::regconfig"), func.coalesce(column, literal_column("''"))),
+        literal_column(f"'{weight}'"),
+    )
+
+
+def _search_vector(name, producer, varietal, description, food_pairing):
+    """Weighted tsvector over the searchable wine text (Postgres only); stored in wines.search_vector."""
+    return (
+        _weighted_tsvector(name, "A")
+        .op("||")(_weighted_tsvector(producer, "A"))
+        .op("||")(_weighted_tsvector(varietal, "B"))
+        .op("||")(_weighted_tsvector(description, "C"))
+        .op("||")(_weighted_tsvector(food_pairing, "C"))
+    )
+
+
 class Wine(Base):
     __tablename__ = "wines"
 
@@ -22,4 +43,96 @@ class Wine(Base):
     product_url = Column(String, nullable=True) # New field
     size = Column(String, nullable=True) # New field
     source = Column(String, nullable=True) # New field to store "martel.ch"
+    version = Column(Integer, nullable=False, default=1, server_default="1") # Bumped on every update, checked via If-Match
     # Add more fields as needed, e.g., alcohol_content, tasting_notes, stock_quantity
+
+    __table_args__ = (
+        # (sort_key, id) indexes back keyset pagination on GET /wines/ (see app/pagination.py)
+        Index("ix_wines_price_id", "price", "id"),
+        Index("ix_wines_vintage_id", "vintage", "id"),
+        Index("ix_wines_name_id", "name", "id"),
+        # The descending sorts order by "key DESC NULLS LAST, id DESC", which Postgres
+        # can only read from an index in that order (a backward scan of the indexes
+        # above gives NULLS FIRST). SQLite puts NULLs last on DESC already.
+        Index("ix_wines_price_desc_id", price.desc().nulls_last(), id.desc()).ddl_if(dialect="postgresql"),
+        Index("ix_wines_vintage_desc_id", vintage.desc().nulls_last(), id.desc()).ddl_if(dialect="postgresql"),
+        Index("ix_wines_name_desc_id", name.desc().nulls_last(), id.desc()).ddl_if(dialect="postgresql"),
+        # Composite indexes for the catalog filters and facet counts (see app/catalog.py)
+        Index("ix_wines_type_price", "type", "price"),
+        Index("ix_wines_country_region", "country", "region"),
+        Index("ix_wines_varietal_price", "varietal", "price"),
+        Index("ix_wines_body_type_price", "body_type", "price"),
+        Index("ix_wines_type_vintage", "type", "vintage"),
+        # Conflict target of the bulk upsert (POST /wines/bulk); NULLs don't conflict
+        Index("ux_wines_product_url", "product_url", unique=True),
+        # Trigram index for GET /wines/search; the full-text column and its index are
+        # added below. Both only exist on Postgres; other databases fall back to the
+        # in-Python ranking in app/search.py. Skipped when pg_trgm is not installed.
+        Index(
+            "ix_wines_name_trgm", name,
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql", callable_=lambda ddl, target, bind, **kw: bind is None or pg_trgm_installed(bind)),
+    )
+
+
+def pg_trgm_installed(connection) -> bool:
+    return connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+
+
+@event.listens_for(Base.metadata, "before_create")
+def _create_pg_trgm(target, connection, **kw):
+    # pg_trgm is a contrib extension: the server may not ship it, or this role may
+    # not be allowed to create it. Either way the app still starts, and search
+    # goes without the trigram typo fallback.
+    if connection.dialect.name != "postgresql" or pg_trgm_installed(connection):
+        return
+    if connection.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first() is None:
+        print("pg_trgm is not available on this Postgres server; trigram search is disabled.")
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except DBAPIError as e:
+        print(f"Could not create the pg_trgm extension ({e.orig}); trigram search is disabled.")
+
+
+# Stored tsvector for full-text search, kept up to date by Postgres itself, so
+# matching and ts_rank_cd read it instead of re-running to_tsvector per row.
+# It is not a mapped column (SQLite cannot create it), so plain ORM selects never
+# load it. A new wines table gets it right after CREATE TABLE, while it is still
+# empty. On an existing table adding it rewrites every row under an ACCESS
+# EXCLUSIVE lock, so that is left to migrate_db.py rather than worker startup.
+_SEARCH_VECTOR_SQL = str(
+    _search_vector(column("name"), column("producer"), column("varietal"), column("description"), column("food_pairing"))
+    .compile(dialect=postgresql.dialect())
+)
+SEARCH_VECTOR_MIGRATION = (
+    f"ALTER TABLE wines ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({_SEARCH_VECTOR_SQL}) STORED",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_wines_search_vector_gin ON wines USING gin (search_vector)",
+    # The expression index that served search before the stored column existed
+    "DROP INDEX CONCURRENTLY IF EXISTS ix_wines_search_vector",
+)
+for _statement in SEARCH_VECTOR_MIGRATION[:2]:
+    # CONCURRENTLY cannot run inside create_all's transaction, and is pointless on an empty table
+    event.listen(Wine.__table__, "after_create", DDL(_statement.replace(" CONCURRENTLY", "")).execute_if(dialect="postgresql"))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _add_wine_version_column(target, connection, **kw):
+    # create_all never alters an existing table, so databases created before the
+    # version column get it here. Idempotent; on Postgres 11+ a constant default
+    # makes this a catalog-only change, with no table rewrite.
+    if "version" not in {c["name"] for c in inspect(connection).get_columns("wines")}:
+        connection.execute(text("ALTER TABLE wines ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+
+def wine_search_vector(stored: bool = True):
+    """
+    The stored wines.search_vector column (Postgres only), indexed by
+    ix_wines_search_vector_gin; with stored=False the same tsvector computed per
+    row, for databases that migrate_db.py has not migrated yet.
+    """
+    if not stored:
+        return _search_vector(Wine.name, Wine.producer, Wine.varietal, Wine.description, Wine.food_pairing)
+    return literal_column("wines.search_vector", type_=postgresql.TSVECTOR)
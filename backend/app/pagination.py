@@ -0,0 +1,128 @@
+import base64
+import json
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.sql import Select
+
+from app import models
+
+# Sort orders supported by the catalog. A leading "-" means descending.
+# Every order is made total by using the primary key as a tie-breaker, which
+# is what lets us seek with (sort_key, id) instead of counting rows with OFFSET.
+SORT_COLUMNS = {
+    "id": models.Wine.id,
+    "price": models.Wine.price,
+    "vintage": models.Wine.vintage,
+    "name": models.Wine.name,
+}
+SORT_OPTIONS = list(SORT_COLUMNS) + [f"-{key}" for key in SORT_COLUMNS]
+
+
+class InvalidCursorError(ValueError):
+    """Raised when an `after` token cannot be decoded or does not match the sort order."""
+
+
+def parse_sort(sort: str) -> Tuple[str, bool]:
+    """Splits a sort option like "-price" into ("price", True)."""
+    descending = sort.startswith("-")
+    key = sort[1:] if descending else sort
+    if key not in SORT_COLUMNS:
+        raise ValueError(f"Unsupported sort order '{sort}'. Use one of: {', '.join(SORT_OPTIONS)}")
+    return key, descending
+
+
+def encode_cursor(sort: str, sort_value: Any, wine_id: int) -> str:
+    """Encodes the position after a row as an opaque, URL-safe token."""
+    payload = json.dumps({"s": sort, "k": sort_value, "i": wine_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort: str) -> Tuple[Any, int]:
+    """Decodes an `after` token back into (sort_value, id) for the given sort order."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cursor_sort, sort_value, wine_id = payload["s"], payload["k"], int(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError("Malformed pagination cursor.") from e
+    if cursor_sort != sort:
+        raise InvalidCursorError(f"Cursor was issued for sort '{cursor_sort}', not '{sort}'.")
+    return sort_value, wine_id
+
+
+def apply_sort(query: Select, sort: str) -> Select:
+    """Orders a wine query by the sort key (NULLs last) and then by id."""
+    key, descending = parse_sort(sort)
+    column = SORT_COLUMNS[key]
+    if key == "id":
+        return query.order_by(column.desc() if descending else column.asc())
+    id_order = models.Wine.id.desc() if descending else models.Wine.id.asc()
+    key_order = column.desc() if descending else column.asc()
+    return query.order_by(key_order.nulls_last(), id_order)
+
+
+def _null_block(query: Select, column, descending: bool, wine_id: Optional[int]) -> Select:
+    # Inside the NULL block the sort key is constant, so the order is the id alone;
+    # "key IS NULL AND id > ?" is then a seek into the (sort_key, id) index.
+    wine_id_col = models.Wine.id
+    query = query.where(column.is_(None)).order_by(None)
+    query = query.order_by(wine_id_col.desc() if descending else wine_id_col.asc())
+    if wine_id is not None:
+        query = query.where(wine_id_col < wine_id if descending else wine_id_col > wine_id)
+    return query
+
+
+def apply_cursor(query: Select, sort: str, after: Optional[str]) -> Select:
+    """
+    Restricts a sorted wine query to the rows after the `after` cursor.
+    The predicates are written as row-value comparisons so the database can
+    seek into the matching (sort_key, id) index instead of scanning. A cursor
+    in the non-NULL block seeks within that block only (the comparison is
+    never true for NULL keys); `null_block_fill` continues a short page into
+    the trailing NULL block.
+    """
+    if not after:
+        return query
+    key, descending = parse_sort(sort)
+    sort_value, wine_id = decode_cursor(after, sort)
+    column = SORT_COLUMNS[key]
+    wine_id_col = models.Wine.id
+
+    if key == "id":
+        return query.where(wine_id_col < wine_id if descending else wine_id_col > wine_id)
+
+    if sort_value is None:
+        # We are already inside the trailing block of NULL sort keys.
+        return _null_block(query, column, descending, wine_id)
+
+    position = tuple_(column, wine_id_col)
+    return query.where(position < (sort_value, wine_id) if descending else position > (sort_value, wine_id))
+
+
+def null_block_fill(query: Select, sort: str, after: Optional[str]) -> Optional[Select]:
+    """
+    For a page read with `apply_cursor` that came back short: the query (sorted
+    but without the cursor applied) for the first rows of the NULL block, which
+    come next in the order. None when there is nothing to fill: id sorts have no
+    NULLs, a first page already runs into the NULL block, and a cursor inside
+    the NULL block has reached the end of the results.
+    """
+    if not after:
+        return None
+    key, descending = parse_sort(sort)
+    if key == "id":
+        return None
+    sort_value, _ = decode_cursor(after, sort)
+    if sort_value is None:
+        return None
+    return _null_block(query, SORT_COLUMNS[key], descending, None)
+
+
+def next_cursor_for(rows: list, sort: str, limit: int) -> Optional[str]:
+    """Returns the cursor for the page after `rows`, or None if this was the last page."""
+    if not rows or len(rows) < limit:
+        return None
+    key, _ = parse_sort(sort)
+    last = rows[-1]
+    return encode_cursor(sort, getattr(last, key), last.id)
@@ -14,6 +14,7 @@ try:
     from app.models import Wine # Ensure Wine model is imported for table creation
     from app.config import settings # For OPENAI_API_KEY
     from app.rag.config import FAISS_INDEX_PATH, EMBEDDING_MODEL_NAME, LLM_MODEL_NAME # For defaults
+    from app.rag.config import EMBEDDING_BATCH_SIZE, INDEX_BUILD_WORKERS, INDEX_SHARD_SIZE
 except ImportError as e:
     print(f"Error importing modules: {e}")
     print("Please ensure that the script is run from the \'backend\' directory or that PYTHONPATH is set correctly.")
@@ -35,8 +36,12 @@ async def main():
     print("Database tables checked/created.")
 
     parser = argparse.ArgumentParser(description="Create or update the FAISS vector index for the AI Sommelier.")
-    # No arguments needed for now, as it only does one thing: indexing.
-    # Potentially add --force-reindex or other options later.
+    parser.add_argument("--workers", type=int, default=INDEX_BUILD_WORKERS,
+                        help=f"Embedding processes (default: {INDEX_BUILD_WORKERS}, one per core).")
+    parser.add_argument("--shard-size", type=int, default=INDEX_SHARD_SIZE,
+                        help=f"Documents per shard (default: {INDEX_SHARD_SIZE}).")
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE,
+                        help=f"Texts per embedding model call (default: {EMBEDDING_BATCH_SIZE}).")
     args = parser.parse_args()
 
     print("Instantiating RAGPipeline...")
@@ -45,11 +50,12 @@ async def main():
         openai_api_key=settings.OPENAI_API_KEY,
         faiss_index_path=FAISS_INDEX_PATH,
         embedding_model_name=EMBEDDING_MODEL_NAME,
-        llm_name=LLM_MODEL_NAME
+        llm_name=LLM_MODEL_NAME,
+        embedding_batch_size=args.batch_size,
     )
     
     print("Running indexing process...")
-    await pipeline.run_indexing()
+    await pipeline.run_indexing(workers=args.workers, shard_size=args.shard_size)
     print("Indexing process has been initiated and should complete shortly.")
 
 if __name__ == "__main__":
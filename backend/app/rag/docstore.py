@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from langchain.docstore.document import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+
+DOCSTORE_FILENAME = "docstore.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,          -- str(source_db_id), the wine id
+    page_content TEXT NOT NULL,
+    metadata TEXT NOT NULL,       -- JSON
+    content_hash TEXT NOT NULL    -- content_hash(page_content), what the vector was embedded from
+);
+CREATE TABLE IF NOT EXISTS faiss_ids (
+    faiss_id INTEGER PRIMARY KEY, -- id FAISS returns from a search
+    doc_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_faiss_ids_doc_id ON faiss_ids (doc_id);
+"""
+
+
+def content_hash(page_content: str) -> str:
+    return hashlib.sha256(page_content.encode("utf-8")).hexdigest()
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    On-disk docstore for the FAISS index, replacing the pickled index.pkl.
+
+    Nothing is read at load time: a search hydrates only its top-k hits with
+    one primary-key lookup each. Connections are per thread, so searches can
+    run from a thread pool. Open with `readonly=True` in the API workers.
+    """
+
+    def __init__(self, path: str, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        self._local = threading.local()
+        if not readonly:
+            with self._connection() as conn:
+                conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.readonly:
+                conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            else:
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self._connection().execute(
+            "SELECT page_content, metadata FROM documents WHERE id = ?", (search,)
+        ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO documents (id, page_content, metadata, content_hash) VALUES (?, ?, ?, ?)",
+                [
+                    (doc_id, doc.page_content, json.dumps(doc.metadata, default=str), content_hash(doc.page_content))
+                    for doc_id, doc in texts.items()
+                ],
+            )
+
+    def delete(self, ids: List) -> None:
+        """Deletes the documents and their FAISS id mappings."""
+        with self._connection() as conn:
+            conn.executemany("DELETE FROM documents WHERE id = ?", [(doc_id,) for doc_id in ids])
+            conn.executemany("DELETE FROM faiss_ids WHERE doc_id = ?", [(doc_id,) for doc_id in ids])
+
+    def add_indexed(self, documents: Iterable[tuple[int, str, Document]]) -> None:
+        """Adds (faiss_id, doc_id, document) triples: the documents and their FAISS id mappings."""
+        documents_by_id, faiss_ids = {}, {}
+        for faiss_id, doc_id, document in documents:
+            documents_by_id[doc_id] = document
+            faiss_ids[faiss_id] = doc_id
+        self.add(documents_by_id)
+        FaissIdMap(self).update(faiss_ids)
+
+    def content_hashes(self, ids: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """Stored content hash per document id, for `ids` or for every document."""
+        conn = self._connection()
+        if ids is None:
+            return dict(conn.execute("SELECT id, content_hash FROM documents"))
+        hashes = {}
+        for doc_id in ids:
+            row = conn.execute("SELECT content_hash FROM documents WHERE id = ?", (doc_id,)).fetchone()
+            if row is not None:
+                hashes[doc_id] = row[0]
+        return hashes
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class FaissIdMap(MutableMapping):
+    """
+    The FAISS id -> docstore id map (LangChain's `index_to_docstore_id`), read
+    from the docstore's faiss_ids table on demand instead of held in memory.
+    """
+
+    def __init__(self, docstore: SQLiteDocstore):
+        self.docstore = docstore
+
+    def __getitem__(self, faiss_id: int) -> str:
+        row = self.docstore._connection().execute(
+            "SELECT doc_id FROM faiss_ids WHERE faiss_id = ?", (int(faiss_id),)
+        ).fetchone()
+        if row is None:
+            raise KeyError(faiss_id)
+        return row[0]
+
+    def __setitem__(self, faiss_id: int, doc_id: str) -> None:
+        self.update({faiss_id: doc_id})
+
+    def update(self, other=(), **kwargs) -> None:
+        items = list(dict(other, **kwargs).items())
+        with self.docstore._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO faiss_ids (faiss_id, doc_id) VALUES (?, ?)",
+                [(int(faiss_id), doc_id) for faiss_id, doc_id in items],
+            )
+
+    def __delitem__(self, faiss_id: int) -> None:
+        with self.docstore._connection() as conn:
+            deleted = conn.execute("DELETE FROM faiss_ids WHERE faiss_id = ?", (int(faiss_id),)).rowcount
+        if not deleted:
+            raise KeyError(faiss_id)
+
+    def __iter__(self) -> Iterator[int]:
+        for (faiss_id,) in self.docstore._connection().execute("SELECT faiss_id FROM faiss_ids ORDER BY faiss_id"):
+            yield faiss_id
+
+    def __len__(self) -> int:
+        return self.docstore._connection().execute("SELECT COUNT(*) FROM faiss_ids").fetchone()[0]
+
+
+def open_docstore(path: str, readonly: bool = True) -> Optional[SQLiteDocstore]:
+    if not os.path.exists(path):
+        return None
+    return SQLiteDocstore(path, readonly=readonly)
@@ -0,0 +1,180 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+from app.rag.faiss_io import index_write_lock
+
+# On-disk cache of document embeddings, addressed by (embedding model, SHA-256
+# of page_content). Re-indexing an unchanged catalog then embeds nothing.
+#
+# One directory per model holds:
+#   vectors.f32   float32 rows, appended, read back through np.memmap
+#   index.sqlite  content hash -> row number, plus the vector size and the
+#                 measured cost of one embedding (for the "time saved" report)
+#
+# Appends take the same flock as index writes, on the cache directory.
+
+VECTORS_FILENAME = "vectors.f32"
+INDEX_FILENAME = "index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    content_hash TEXT PRIMARY KEY,
+    row INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def _model_dirname(model_name: str) -> str:
+    # Model names may contain "/" (e.g. sentence-transformers/...); the hash keeps slugs unique
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+    return f"{slug}-{hashlib.sha256(model_name.encode('utf-8')).hexdigest()[:8]}"
+
+
+@dataclass
+class EmbeddingStats:
+    hits: int = 0
+    misses: int = 0
+    embed_seconds: float = 0.0 # Time spent embedding the misses
+    seconds_saved: float = 0.0 # Estimated from the cache's average cost per embedding
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def merge(self, other: "EmbeddingStats") -> None:
+        self.hits += other.hits
+        self.misses += other.misses
+        self.embed_seconds += other.embed_seconds
+        self.seconds_saved += other.seconds_saved
+
+    def __str__(self):
+        return (f"{self.hits}/{self.hits + self.misses} cache hits ({self.hit_rate:.1%}), "
+                f"embedded {self.misses} in {self.embed_seconds:.2f}s, saved ~{self.seconds_saved:.2f}s")
+
+
+class EmbeddingCache:
+    def __init__(self, cache_path: str, model_name: str):
+        self.directory = os.path.join(cache_path, _model_dirname(model_name))
+        os.makedirs(self.directory, exist_ok=True)
+        self.vectors_path = os.path.join(self.directory, VECTORS_FILENAME)
+        self._index_path = os.path.join(self.directory, INDEX_FILENAME)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self._index_path)
+        return conn
+
+    def _meta(self, key: str):
+        row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for the given content hashes; misses are left out."""
+        dim = self._meta("dim")
+        if dim is None or not os.path.exists(self.vectors_path):
+            return {}
+        rows = {}
+        for content_hash in set(hashes):
+            row = self._connection().execute("SELECT row FROM rows WHERE content_hash = ?", (content_hash,)).fetchone()
+            if row is not None:
+                rows[content_hash] = row[0]
+        # Only whole rows are mapped: bytes left by an interrupted append are ignored
+        # here and overwritten by the next put_many
+        row_count = os.path.getsize(self.vectors_path) // (int(dim) * 4)
+        rows = {content_hash: row for content_hash, row in rows.items() if row < row_count}
+        if not rows:
+            return {}
+        vectors = np.memmap(self.vectors_path, dtype="float32", mode="r", shape=(row_count, int(dim)))
+        return {content_hash: np.array(vectors[row]) for content_hash, row in rows.items()}
+
+    def put_many(self, hashes: Sequence[str], vectors: np.ndarray, seconds: float) -> None:
+        """Appends vectors for new content hashes. `seconds` is what embedding them took."""
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        dim = vectors.shape[1]
+        with index_write_lock(self.directory):
+            stored_dim = self._meta("dim")
+            if stored_dim is not None and int(stored_dim) != dim:
+                raise ValueError(f"Embedding cache {self.directory} holds {int(stored_dim)}-d vectors, got {dim}-d")
+            # Rows are counted from the file size, so bytes left by an interrupted
+            # append are skipped rather than misread
+            first_row = os.path.getsize(self.vectors_path) // (dim * 4) if os.path.exists(self.vectors_path) else 0
+            with open(self.vectors_path, "r+b" if first_row else "wb") as f:
+                f.seek(first_row * dim * 4)
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with self._connection() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO rows (content_hash, row) VALUES (?, ?)",
+                    [(content_hash, first_row + i) for i, content_hash in enumerate(hashes)],
+                )
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (dim,))
+                if len(vectors):
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('seconds_per_embedding', ?)",
+                        (seconds / len(vectors),),
+                    )
+
+    def embed(self, texts: Sequence[str], hashes: Sequence[str],
+              embed_documents: Callable[[List[str]], List[List[float]]]) -> tuple[np.ndarray, EmbeddingStats]:
+        """
+        Vectors for `texts` (with their content hashes), calling `embed_documents`
+        only for the ones not cached yet and caching those afterwards.
+        """
+        stats = EmbeddingStats()
+        cached = self.get_many(hashes)
+        missing = {}
+        for text, content_hash in zip(texts, hashes):
+            if content_hash not in cached:
+                missing.setdefault(content_hash, text)
+        stats.hits = len(texts) - sum(1 for content_hash in hashes if content_hash not in cached)
+        stats.misses = len(texts) - stats.hits
+
+        # Hits are priced at the cost per embedding measured now, or on the last run that embedded anything
+        seconds_per_embedding = self._meta("seconds_per_embedding")
+        if missing:
+            start = time.perf_counter()
+            new_vectors = np.asarray(embed_documents(list(missing.values())), dtype="float32")
+            stats.embed_seconds = time.perf_counter() - start
+            self.put_many(list(missing), new_vectors, stats.embed_seconds)
+            cached.update(zip(missing, new_vectors))
+            seconds_per_embedding = stats.embed_seconds / len(missing)
+        stats.seconds_saved = stats.hits * (seconds_per_embedding or 0.0)
+
+        if not texts:
+            return np.empty((0, 0), dtype="float32"), stats
+        return np.stack([cached[content_hash] for content_hash in hashes]), stats
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def embed_texts(texts: Sequence[str], hashes: Sequence[str],
+                embed_documents: Callable[[List[str]], List[List[float]]],
+                cache: "EmbeddingCache | None" = None) -> tuple[np.ndarray, EmbeddingStats]:
+    """Embeds `texts` through `cache` if given, else directly; returns float32 vectors and stats."""
+    if cache is not None:
+        return cache.embed(texts, hashes, embed_documents)
+    start = time.perf_counter()
+    vectors = np.asarray(embed_documents(list(texts)), dtype="float32")
+    return vectors, EmbeddingStats(misses=len(texts), embed_seconds=time.perf_counter() - start)
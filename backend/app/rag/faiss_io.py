@@ -0,0 +1,107 @@
+import fcntl
+import math
+import os
+from contextlib import contextmanager
+from typing import Sequence
+
+import faiss
+import numpy as np
+
+# FAISS can only memory-map inverted lists: an IndexFlat is always copied
+# into RAM by read_index, even with IO_FLAG_MMAP. So for mmap the index is
+# persisted as an IVFFlat whose nprobe equals nlist. Every search then scans
+# every list, which returns exactly the results a flat index would, but the
+# vectors stay in the file and all workers on a host share them via the page cache.
+#
+# Either way the FAISS ids are the wine ids, so single wines can be removed
+# and re-added in place (see app/rag/index_maintenance.py).
+
+MMAP_IO_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+INDEX_FILENAME = "index.faiss"
+LOCK_FILENAME = "index.lock"
+
+
+def new_index(training_vectors: np.ndarray, total: int, mmap: bool) -> faiss.Index:
+    """
+    An empty L2 index for `total` vectors: an exhaustive IVFFlat when `mmap` is
+    set (trained on `training_vectors`), else an IndexIDMap over IndexFlatL2.
+    Copies of it can be filled independently and merged (see app/rag/index_build.py).
+    """
+    training_vectors = np.ascontiguousarray(training_vectors, dtype="float32")
+    dim = training_vectors.shape[1]
+    if not mmap:
+        return faiss.IndexIDMap(faiss.IndexFlatL2(dim))
+    # Capped so every list gets the 39 training points FAISS asks for
+    nlist = max(1, min(int(math.sqrt(total)), 1024, len(training_vectors) // 39))
+    quantizer = faiss.IndexFlatL2(dim)
+    index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_L2)
+    index.train(training_vectors)
+    index.nprobe = nlist
+    return index
+
+
+def training_sample_size(total: int) -> int:
+    """Vectors needed to train new_index() for `total` vectors (FAISS asks for 39 per list)."""
+    return min(total, 39 * max(1, min(int(math.sqrt(total)), 1024)))
+
+
+def build_index(vectors: np.ndarray, ids: Sequence[int], mmap: bool) -> faiss.Index:
+    """Builds an index over `vectors` keyed by `ids` in one go (see new_index)."""
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    index = new_index(vectors, len(vectors), mmap)
+    index.add_with_ids(vectors, np.asarray(ids, dtype="int64"))
+    return index
+
+
+def merge_indexes(paths: Sequence[str]) -> faiss.Index:
+    """Merges index files filled from copies of one new_index() into a single in-memory index."""
+    index = faiss.read_index(paths[0])
+    for path in paths[1:]:
+        index.merge_from(faiss.read_index(path), 0) # 0: keep the shards' ids (wine ids)
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = index.nlist
+    return index
+
+
+def read_index(path: str, mmap: bool) -> faiss.Index:
+    """Reads index.faiss, memory-mapped and read-only when `mmap` is set."""
+    index = faiss.read_index(path, MMAP_IO_FLAGS if mmap else 0)
+    if mmap and not isinstance(index, faiss.IndexIVF):
+        print(f"Warning: {path} holds a {type(index).__name__}, which FAISS cannot memory-map; "
+              "it was loaded into RAM. Rebuild the index to get a shareable layout.")
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = index.nlist  # Exhaustive: same results as a flat index
+    return index
+
+
+def write_index(index: faiss.Index, path: str) -> None:
+    """Writes the index next to `path` and swaps it in atomically; readers keep their old mapping."""
+    faiss.write_index(index, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+
+
+def index_version(path: str):
+    """
+    Identifies the index file currently on disk. Every write swaps in a new
+    file, so a changed version means the loaded index is out of date.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+@contextmanager
+def index_write_lock(directory: str):
+    """
+    Exclusive lock on the index directory for read-modify-write of the index and
+    docstore. It is an flock, so it serializes writers across worker processes.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILENAME), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
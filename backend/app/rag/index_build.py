@@ -0,0 +1,160 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+from typing import Callable, List
+
+import faiss
+import numpy as np
+
+from app.rag.docstore import content_hash
+from app.rag.embedding_cache import EmbeddingCache, EmbeddingStats, embed_texts
+
+# Sharded index build. Documents arrive in shards (see RAGPipeline.run_indexing);
+# each shard is embedded in batches and added to its own copy of one empty (for
+# IVF: already trained) index, then written to disk. With several workers the
+# shards are built in parallel processes, each with its own embedding model.
+# The shard files are merged into the final index at the end.
+
+
+@dataclass
+class ShardTask:
+    shard_no: int
+    texts: List[str]
+    ids: List[int]
+    template_path: str # Empty index every shard starts from
+    output_path: str
+
+
+@dataclass
+class ShardResult:
+    shard_no: int
+    docs: int
+    seconds: float
+    output_path: str
+    embedding: EmbeddingStats = field(default_factory=EmbeddingStats)
+
+
+def build_shard(task: ShardTask, embed_documents: Callable[[List[str]], List[List[float]]],
+                cache: EmbeddingCache | None, batch_size: int) -> ShardResult:
+    """Embeds one shard `batch_size` texts at a time, adds them to a copy of the template and writes it."""
+    start = time.perf_counter()
+    index = faiss.read_index(task.template_path)
+    stats = EmbeddingStats()
+    for offset in range(0, len(task.texts), batch_size):
+        texts = task.texts[offset:offset + batch_size]
+        vectors, batch_stats = embed_texts(texts, [content_hash(text) for text in texts], embed_documents, cache)
+        index.add_with_ids(vectors, np.asarray(task.ids[offset:offset + batch_size], dtype="int64"))
+        stats.merge(batch_stats)
+    faiss.write_index(index, task.output_path)
+    return ShardResult(task.shard_no, len(task.texts), time.perf_counter() - start, task.output_path, stats)
+
+
+# Per-process state of the worker pool, set up once by _init_worker
+_worker_embeddings = None
+_worker_cache = None
+_worker_batch_size = 0
+
+
+def _init_worker(model_name: str, batch_size: int, cache_path: str | None, threads: int):
+    global _worker_embeddings, _worker_cache, _worker_batch_size
+    try:
+        import torch
+        torch.set_num_threads(threads) # Split the cores between workers instead of oversubscribing
+    except ImportError:
+        pass
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    _worker_embeddings = HuggingFaceEmbeddings(model_name=model_name, encode_kwargs={"batch_size": batch_size})
+    _worker_cache = EmbeddingCache(cache_path, model_name) if cache_path else None
+    _worker_batch_size = batch_size
+
+
+def _build_shard_in_worker(task: ShardTask) -> ShardResult:
+    return build_shard(task, _worker_embeddings.embed_documents, _worker_cache, _worker_batch_size)
+
+
+class BuildProgress:
+    """Prints per-shard and overall throughput while a build runs."""
+
+    def __init__(self, total_docs: int, total_shards: int):
+        self.total_docs = total_docs
+        self.total_shards = total_shards
+        self.done_docs = 0
+        self.done_shards = 0
+        self.embedding = EmbeddingStats()
+        self.start = time.perf_counter()
+
+    def shard_done(self, result: ShardResult):
+        self.done_docs += result.docs
+        self.done_shards += 1
+        self.embedding.merge(result.embedding)
+        elapsed = time.perf_counter() - self.start
+        rate = self.done_docs / elapsed if elapsed else 0.0
+        eta = (self.total_docs - self.done_docs) / rate if rate else 0.0
+        print(f"Shard {result.shard_no + 1}/{self.total_shards}: {result.docs} docs in {result.seconds:.1f}s "
+              f"({result.docs / result.seconds if result.seconds else 0:.0f} docs/s). "
+              f"Total {self.done_docs}/{self.total_docs} docs, {rate:.0f} docs/s, ETA {eta:.0f}s")
+
+    @property
+    def docs_per_second(self) -> float:
+        elapsed = time.perf_counter() - self.start
+        return self.total_docs / elapsed if elapsed else 0.0
+
+
+class ShardBuilder:
+    """
+    Builds shards as they are submitted: in this process with the caller's model
+    when `workers` is 1, else in a pool of `workers` spawned processes. submit()
+    waits while every worker is busy, which is what bounds the work in flight.
+    """
+
+    def __init__(self, workers: int, progress: BuildProgress,
+                 embed_documents: Callable[[List[str]], List[List[float]]], cache: EmbeddingCache | None,
+                 model_name: str, batch_size: int, cache_path: str | None):
+        self.workers = max(1, workers)
+        self.progress = progress
+        self.embed_documents = embed_documents
+        self.cache = cache
+        self.batch_size = batch_size
+        self.results: List[ShardResult] = []
+        self._in_flight: set = set()
+        self._pool = None
+        if self.workers > 1:
+            # Spawned, not forked: the parent may already hold torch / FAISS thread pools
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_name, batch_size, cache_path, max(1, (os.cpu_count() or 1) // self.workers)),
+            )
+
+    def _done(self, result: ShardResult):
+        self.results.append(result)
+        self.progress.shard_done(result)
+
+    async def submit(self, task: ShardTask) -> None:
+        if self._pool is None:
+            # In a thread, so the event loop keeps reading the next shard from the database
+            self._done(await asyncio.to_thread(build_shard, task, self.embed_documents, self.cache, self.batch_size))
+            return
+        if len(self._in_flight) >= self.workers:
+            await self._wait(asyncio.FIRST_COMPLETED)
+        self._in_flight.add(asyncio.get_running_loop().run_in_executor(self._pool, _build_shard_in_worker, task))
+
+    async def _wait(self, return_when):
+        done, self._in_flight = await asyncio.wait(self._in_flight, return_when=return_when)
+        for future in done:
+            self._done(future.result())
+
+    async def finish(self) -> List[ShardResult]:
+        """Waits for every submitted shard; returns the results in shard order."""
+        if self._in_flight:
+            await self._wait(asyncio.ALL_COMPLETED)
+        return sorted(self.results, key=lambda result: result.shard_no)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
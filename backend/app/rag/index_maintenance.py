@@ -0,0 +1,212 @@
+import asyncio
+import fcntl
+import os
+import sqlite3
+import time
+from typing import Awaitable, Callable, Iterable
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import ReplicaSessionLocal, SessionLocal
+from app.models import Wine
+
+# Keeps the persisted FAISS index in step with the wines table without full
+# rebuilds. Catalog writes enqueue wine ids in memory; every worker's background
+# task flushes them to a queue file shared by all workers on the host (next to
+# the index). One worker, elected through an flock, drains that queue in batches
+# and applies them with RAGPipeline.update_index, and runs the periodic
+# reconciliation pass that compares content hashes against the table and
+# repairs any drift (writes from other tools, failed updates, a changed
+# document template). The other workers never load anything for maintenance;
+# they pick the new index up through RAGPipeline.index_changed().
+#
+# This module stays free of langchain imports; the pipeline comes from the
+# `get_pipeline` coroutine (app.api.endpoints.rag.get_maintenance_pipeline),
+# which only the elected worker calls.
+
+# Ids per SELECT ... WHERE id IN (...) when re-reading wines; stays well under
+# asyncpg's 32767 bind parameter limit
+LOAD_BATCH_SIZE = 1000
+PENDING_FILENAME = "pending_updates.sqlite"
+MAINTAINER_LOCK_FILENAME = "maintainer.lock"
+
+
+class PendingUpdates:
+    """Wine ids waiting to be applied to the index, in a SQLite file shared by the workers."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, PENDING_FILENAME)
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("CREATE TABLE IF NOT EXISTS pending (wine_id INTEGER PRIMARY KEY)")
+        return conn
+
+    def add(self, wine_ids: Iterable[int]) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO pending (wine_id) VALUES (?)", [(int(i),) for i in wine_ids])
+        finally:
+            conn.close()
+
+    def take(self) -> set[int]:
+        """Removes and returns every queued id."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE") # No add() slips in between the read and the delete
+                wine_ids = {wine_id for (wine_id,) in conn.execute("SELECT wine_id FROM pending")}
+                conn.execute("DELETE FROM pending")
+            return wine_ids
+        finally:
+            conn.close()
+
+
+def _wine_record(wine: Wine) -> dict:
+    return {column.name: getattr(wine, column.name) for column in Wine.__table__.columns}
+
+
+class IndexMaintainer:
+    def __init__(self, get_pipeline: Callable[[], Awaitable], index_path: str):
+        self.get_pipeline = get_pipeline
+        self.index_path = index_path
+        self.queue = PendingUpdates(index_path)
+        self._pending: set[int] = set() # Written by this worker, not yet flushed to the queue
+        self._task: asyncio.Task | None = None
+        self._leader_lock = None # Open lock file while this worker is the elected maintainer
+        self.last_reconcile: dict | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_lock is not None
+
+    def enqueue(self, wine_ids: Iterable[int]) -> None:
+        """Schedules the given wines for re-indexing (created, updated or deleted alike)."""
+        if self._task is None:
+            return # Maintenance disabled; nothing would drain the queue
+        self._pending.update(wine_ids)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            try:
+                await self._flush() # Hand what this worker still holds to the next maintainer
+            except Exception as e:
+                print(f"Could not queue {len(self._pending)} index updates on shutdown: {e}")
+        if self._leader_lock is not None:
+            self._leader_lock.close() # Releases the flock; another worker takes over
+            self._leader_lock = None
+
+    def _try_lead(self) -> bool:
+        """Becomes the maintainer if no other process on this host is (non-blocking)."""
+        if self._leader_lock is None:
+            os.makedirs(self.index_path, exist_ok=True)
+            lock_file = open(os.path.join(self.index_path, MAINTAINER_LOCK_FILENAME), "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+            self._leader_lock = lock_file
+            print(f"This worker (pid {os.getpid()}) maintains the FAISS index.")
+        return True
+
+    async def _flush(self) -> None:
+        if self._pending:
+            wine_ids, self._pending = self._pending, set()
+            try:
+                await asyncio.to_thread(self.queue.add, wine_ids)
+            except Exception:
+                self._pending.update(wine_ids) # Retried on the next pass
+                raise
+
+    async def _run(self):
+        # Every pass waits RAG_INDEX_UPDATE_DELAY_SECONDS, so a burst of writes
+        # (e.g. a bulk import) from any worker is applied as one batch
+        interval = settings.RAG_INDEX_RECONCILE_INTERVAL_SECONDS
+        next_reconcile = time.monotonic() + interval
+        while True:
+            await asyncio.sleep(settings.RAG_INDEX_UPDATE_DELAY_SECONDS)
+            try:
+                await self._flush()
+                if not self._try_lead():
+                    continue
+                wine_ids = await asyncio.to_thread(self.queue.take)
+            except Exception as e:
+                print(f"Index update queue error: {e}")
+                continue
+            if wine_ids:
+                await self.apply(wine_ids)
+            if interval > 0 and time.monotonic() >= next_reconcile:
+                await self.reconcile()
+                next_reconcile = time.monotonic() + interval
+
+    async def apply(self, wine_ids: set[int]) -> dict | None:
+        """
+        Re-reads the wines from the primary and upserts them into the index; ids
+        no longer in the table are removed. Failures are logged, not retried:
+        the next reconciliation pass picks the wines up again.
+        """
+        try:
+            pipeline = await self.get_pipeline()
+            wines = []
+            ordered_ids = sorted(wine_ids)
+            async with SessionLocal() as session:
+                for start in range(0, len(ordered_ids), LOAD_BATCH_SIZE):
+                    batch = ordered_ids[start:start + LOAD_BATCH_SIZE]
+                    result = await session.execute(select(Wine).where(Wine.id.in_(batch)))
+                    wines.extend(_wine_record(wine) for wine in result.scalars())
+            deleted_ids = wine_ids - {wine["id"] for wine in wines}
+            stats = await asyncio.to_thread(pipeline.update_index, wines, deleted_ids)
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            print(f"Incremental index update for {len(wine_ids)} wines failed: {detail}")
+            return None
+        print(f"Index updated: {stats}")
+        return stats
+
+    async def reconcile(self) -> dict | None:
+        """
+        Finds wines whose indexed content differs from the table (missing, stale
+        or deleted) and applies them. Reads the table from the replica; apply()
+        re-reads the drifted rows from the primary, so replica lag only costs
+        a no-op update.
+        """
+        try:
+            pipeline = await self.get_pipeline()
+            indexed = await asyncio.to_thread(pipeline.indexed_content_hashes)
+            if indexed is None:
+                print("Index reconciliation skipped: no FAISS index yet. Run full indexing first.")
+                return None
+            drifted, seen = set(), set()
+            async with ReplicaSessionLocal() as session:
+                result = await session.stream_scalars(
+                    select(Wine).execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+                )
+                async for wine in result:
+                    seen.add(wine.id)
+                    if indexed.get(wine.id) != pipeline.document_content_hash(_wine_record(wine)):
+                        drifted.add(wine.id)
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            print(f"Index reconciliation failed: {detail}")
+            return None
+
+        stale = set(indexed) - seen
+        self.last_reconcile = {"checked": len(seen), "drifted": len(drifted), "stale": len(stale)}
+        print(f"Index reconciliation: {self.last_reconcile}")
+        if drifted or stale:
+            await self.apply(drifted | stale)
+        return self.last_reconcile
@@ -0,0 +1,166 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+from app.metrics import (
+    RAG_ANSWER_CACHE,
+    RAG_ANSWER_CACHE_SECONDS_SAVED,
+    RAG_QUERY_EMBEDDING_CACHE,
+    RAG_QUERY_EMBEDDING_SECONDS_SAVED,
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(question: str) -> str:
+    """
+    Canonical form of a shopper question for cache keys: Unicode NFKC, case-folded,
+    whitespace collapsed, trailing punctuation dropped. "Wine for  raclette?" and
+    "wine for raclette" share a key.
+    """
+    text = unicodedata.normalize("NFKC", question).casefold()
+    return _WHITESPACE.sub(" ", text).strip().rstrip("?!.").strip()
+
+
+@dataclass
+class CachedEmbedding:
+    vector: List[float]
+    seconds: float # What computing it took; credited as saved on every hit
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class QueryEmbeddingCache:
+    """
+    In-process LRU of query embeddings, keyed by normalize_query(question), with
+    a TTL and a size bound. Lookups and inserts hold a lock, so the cache can be
+    shared by concurrent requests whether they embed on the event loop or in a
+    thread pool.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, CachedEmbedding]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and time.monotonic() - entry.created_at > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            RAG_QUERY_EMBEDDING_CACHE.labels("miss").inc()
+            return None
+        RAG_QUERY_EMBEDDING_CACHE.labels("hit").inc()
+        RAG_QUERY_EMBEDDING_SECONDS_SAVED.inc(entry.seconds)
+        return entry.vector
+
+    def put(self, key: str, vector: List[float], seconds: float) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = CachedEmbedding(vector, seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    response: Dict[str, Any] # What RAGPipeline.query returned: answer and source_documents
+    seconds: float # Retrieval + LLM time it took; credited as saved on every hit
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class SemanticAnswerCache:
+    """
+    In-process LRU of sommelier answers, looked up by question embedding: a
+    question whose cosine similarity to a cached one is at least `threshold`
+    gets that answer. Entries belong to one index version; when the index
+    changes (a rebuild or an incremental update) the cache empties itself,
+    since its answers may cite wines that changed. Safe for concurrent use.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.index_version: Hashable = None
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._vectors: Dict[int, np.ndarray] = {} # Unit-length question embeddings by entry id
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype="float32")
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def _check_version(self, index_version: Hashable) -> None:
+        if index_version != self.index_version:
+            self._entries.clear()
+            self._vectors.clear()
+            self.index_version = index_version
+
+    def _evict(self, entry_id: int) -> None:
+        del self._entries[entry_id]
+        del self._vectors[entry_id]
+
+    def get(self, vector: List[float], index_version: Hashable) -> Optional[CachedAnswer]:
+        if self.max_entries <= 0:
+            return None
+        query = self._unit(vector)
+        with self._lock:
+            self._check_version(index_version)
+            if self.ttl_seconds:
+                now = time.monotonic()
+                for entry_id in [i for i, entry in self._entries.items() if now - entry.created_at > self.ttl_seconds]:
+                    self._evict(entry_id)
+            entry = None
+            if self._vectors:
+                ids = list(self._vectors)
+                scores = np.stack([self._vectors[i] for i in ids]) @ query # Cosine similarities
+                position = int(np.argmax(scores))
+                if scores[position] >= self.threshold:
+                    self._entries.move_to_end(ids[position])
+                    entry = self._entries[ids[position]]
+        if entry is None:
+            RAG_ANSWER_CACHE.labels("miss").inc()
+            return None
+        RAG_ANSWER_CACHE.labels("hit").inc()
+        RAG_ANSWER_CACHE_SECONDS_SAVED.inc(entry.seconds)
+        return entry
+
+    def put(self, vector: List[float], index_version: Hashable, question: str,
+            response: Dict[str, Any], seconds: float) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            # The index changed while this answer was generated; it belongs to the old version
+            if index_version != self.index_version:
+                return
+            entry_id, self._next_id = self._next_id, self._next_id + 1
+            self._entries[entry_id] = CachedAnswer(question, response, seconds)
+            self._vectors[entry_id] = self._unit(vector)
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._vectors.clear()
@@ -1,9 +1,14 @@
 \
+import asyncio
 import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 import json # Added for pretty printing
-import pickle
+import numpy as np
 from dotenv import load_dotenv
 
+from sqlalchemy import func
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -12,28 +17,63 @@ from langchain_community.vectorstores import FAISS
 from langchain.docstore.document import Document
 from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA
-from langchain_core.prompts import PromptTemplate # Explicitly using langchain_core.prompts
+from langchain_core.prompts import PromptTemplate, format_document # Explicitly using langchain_core.prompts
 
 from app.rag.config import (
     DOTENV_PATH, # Still useful for fallback or if API key not passed
     FAISS_INDEX_PATH, # Will be passed via constructor, but needed for default
+    FAISS_MMAP,
+    EMBEDDING_CACHE_PATH,
     EMBEDDING_MODEL_NAME, # Will be passed via constructor, but needed for default
     IMPORTANT_FIELDS,
     LLM_MODEL_NAME, # Will be passed via constructor, but needed for default
     LLM_TEMPERATURE, # Can remain a default or also be passed
-    RETRIEVER_K
+    RETRIEVER_K,
+    EMBEDDING_BATCH_SIZE,
+    INDEX_SHARD_SIZE,
+    INDEX_BUILD_WORKERS,
+    INDEX_BUILD_FETCH_SIZE,
+    INDEX_BUILD_QUEUE_SIZE,
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+    ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_TTL_SECONDS,
+    RETRIEVAL_WORKERS,
 )
 from app.models import Wine # For database model
-from app.database import SessionLocal # For database session
+from app.rag.faiss_io import (
+    INDEX_FILENAME,
+    index_version,
+    index_write_lock,
+    merge_indexes,
+    new_index,
+    read_index,
+    training_sample_size,
+    write_index,
+)
+from app.rag.docstore import DOCSTORE_FILENAME, FaissIdMap, SQLiteDocstore, content_hash, open_docstore
+from app.rag.embedding_cache import EmbeddingCache, EmbeddingStats, embed_texts
+from app.rag.index_build import BuildProgress, ShardBuilder, ShardTask
+from app.rag.query_cache import QueryEmbeddingCache, SemanticAnswerCache, normalize_query
+from app.metrics import RAG_QUERIES, RAG_QUERIES_COALESCED, stage_timer
+from app.database import ReplicaSessionLocal # Read replica if configured, else the primary
 
 class RAGPipeline:
     def __init__(self, openai_api_key: str | None = None, 
                  faiss_index_path: str = FAISS_INDEX_PATH, # Default to config if not provided
                  embedding_model_name: str = EMBEDDING_MODEL_NAME, # Default to config
-                 llm_name: str = LLM_MODEL_NAME): # Default to config
+                 llm_name: str = LLM_MODEL_NAME, # Default to config
+                 faiss_mmap: bool = FAISS_MMAP,
+                 embedding_cache_path: str | None = EMBEDDING_CACHE_PATH,
+                 embedding_batch_size: int = EMBEDDING_BATCH_SIZE,
+                 retrieval_workers: int = RETRIEVAL_WORKERS):
         
         self.faiss_index_path = faiss_index_path
+        self.faiss_mmap = faiss_mmap
         self.embedding_model_name = embedding_model_name
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_cache_path = embedding_cache_path
         self.llm_name = llm_name
         
         if openai_api_key:
@@ -42,8 +82,25 @@ class RAGPipeline:
             self.api_key = self._load_openai_api_key_from_env() # Renamed for clarity
 
         self.embeddings = self._initialize_embeddings()
+        self.embedding_cache = EmbeddingCache(embedding_cache_path, embedding_model_name) if embedding_cache_path else None
+        self.query_embedding_cache = QueryEmbeddingCache(QUERY_EMBEDDING_CACHE_MAX_ENTRIES, QUERY_EMBEDDING_CACHE_TTL_SECONDS)
+        self.answer_cache = SemanticAnswerCache(
+            ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_SIMILARITY_THRESHOLD
+        )
+        # Query embedding and FAISS search are CPU-bound and would stall every other
+        # request on the event loop; they run on this pool, which also caps how many
+        # run at once (both release the GIL while computing)
+        self.retrieval_executor = ThreadPoolExecutor(max_workers=max(1, retrieval_workers),
+                                                     thread_name_prefix="rag-retrieval")
         self.vector_store = None # Initialized by load_vector_store or run_indexing
+        self.loaded_index_version = None # index_version() of the index file vector_store was read from
         self.qa_chain = None # Initialized by _initialize_qa_chain
+        self._queries_in_flight: dict[str, asyncio.Task] = {} # normalize_query(question) -> running query
+        self._reload_lock = asyncio.Lock() # One reload per index change, however many queries notice it
+        # update_index keeps the index it last wrote (with that file's index_version),
+        # so consecutive batches in the maintainer skip re-reading index.faiss
+        self._writable_index = None
+        self._writable_index_version = None
 
     def _load_openai_api_key_from_env(self): # Renamed
         """Loads OpenAI API key from .env file if not provided to constructor."""
@@ -57,88 +114,253 @@ class RAGPipeline:
         """Initializes HuggingFace embeddings using the model name from constructor."""
         print(f"Initializing embedding model: {self.embedding_model_name}...")
         try:
-            return HuggingFaceEmbeddings(model_name=self.embedding_model_name)
+            return HuggingFaceEmbeddings(
+                model_name=self.embedding_model_name,
+                encode_kwargs={"batch_size": self.embedding_batch_size},
+            )
         except Exception as e:
             print(f"Error initializing HuggingFaceEmbeddings: {e}")
             print("Please ensure 'sentence-transformers' and 'langchain-huggingface' are installed.")
             raise
 
-    async def _load_wine_data_from_db(self):
-        """Loads wine data from the PostgreSQL database."""
-        print("Loading wine data from database...")
-        wine_data_list = []
-        async with SessionLocal() as session:
-            async with session.begin():
-                result = await session.execute(select(Wine))
-                wines = result.scalars().all()
-                for wine_model in wines:
-                    wine_dict = {column.name: getattr(wine_model, column.name) for column in Wine.__table__.columns}
-                    wine_data_list.append(wine_dict)
-        print(f"Successfully loaded {len(wine_data_list)} wine records from the database.")
-        return wine_data_list
-
-    def _create_wine_documents(self, wine_data_list):
-        """Creates LangChain Document objects from wine data."""
-        documents = []
-        for i, wine in enumerate(wine_data_list):
-            page_content_parts = []
-            metadata = {"source_db_id": wine.get("id", f"wine_db_item_{i}")}
-
-            for field in IMPORTANT_FIELDS:
-                value = wine.get(field)
-                if value is not None:
-                    value_str = ", ".join(map(str, value)) if isinstance(value, list) else str(value)
-                    page_content_parts.append(f"{field.replace('_', ' ').capitalize()}: {value_str}")
-            
-            page_content = "\\\\n".join(page_content_parts)
-            
-            for key, val in wine.items():
-                 if val is not None:
-                    metadata[key] = val
-
-            documents.append(Document(page_content=page_content, metadata=metadata))
-        
-        print(f"Created {len(documents)} documents for embedding.")
-        return documents
+    async def _count_wines(self):
+        async with ReplicaSessionLocal() as session:
+            return (await session.execute(select(func.count()).select_from(Wine))).scalar_one()
 
-    async def run_indexing(self):
-        """Runs the full indexing pipeline: loads data, creates docs, embeds, and saves index."""
-        print("Starting RAG pipeline indexing process (backend)...")
-        
-        wine_data = await self._load_wine_data_from_db()
-        if not wine_data:
-            print("No wine data loaded from database. Exiting indexing.")
-            return
+    async def _stream_wine_records(self):
+        """
+        Yields each wine as a dict of column values, from a column-only select on a
+        server-side cursor (the read replica, if one is configured). No ORM objects
+        are built and only INDEX_BUILD_FETCH_SIZE rows are held at a time.
+        """
+        query = (
+            select(*Wine.__table__.columns)
+            .order_by(Wine.id)
+            .execution_options(yield_per=INDEX_BUILD_FETCH_SIZE)
+        )
+        async with ReplicaSessionLocal() as session:
+            result = await session.stream(query)
+            async for row in result:
+                yield dict(row._mapping)
 
-        langchain_documents = self._create_wine_documents(wine_data)
-        if not langchain_documents:
-            print("No documents created. Exiting indexing.")
-            return
+    def _create_wine_document(self, wine, i=0):
+        """Creates the Document for one wine record; its page_content is what gets embedded."""
+        page_content_parts = []
+        metadata = {"source_db_id": wine.get("id", f"wine_db_item_{i}")}
+
+        for field in IMPORTANT_FIELDS:
+            value = wine.get(field)
+            if value is not None:
+                value_str = ", ".join(map(str, value)) if isinstance(value, list) else str(value)
+                page_content_parts.append(f"{field.replace('_', ' ').capitalize()}: {value_str}")
+
+        page_content = "\\\\n".join(page_content_parts)
+
+        for key, val in wine.items():
+             if val is not None:
+                metadata[key] = val
+
+        return Document(page_content=page_content, metadata=metadata)
+
+    async def _produce_document_shards(self, shards: asyncio.Queue, shard_size: int):
+        """Renders streamed wines into documents and puts them on `shards`, `shard_size` at a time; None ends the stream."""
+        try:
+            documents = []
+            async for wine in self._stream_wine_records():
+                documents.append(self._create_wine_document(wine))
+                if len(documents) == shard_size:
+                    await shards.put(documents) # Waits while the queue is full: backpressure on the DB read
+                    documents = []
+            if documents:
+                await shards.put(documents)
+        except Exception:
+            await shards.put(None) # Unblock the consumer; it re-raises this from the task
+            raise
+        await shards.put(None)
+
+    async def run_indexing(self, workers: int = INDEX_BUILD_WORKERS, shard_size: int = INDEX_SHARD_SIZE):
+        """
+        Runs the full indexing pipeline as a stream: wines are read from the database,
+        rendered to documents, embedded and added to the index shard by shard, with
+        bounded queues between the stages. Memory stays flat as the catalog grows,
+        and database reads overlap with embedding. Shards are embedded by up to
+        `workers` processes.
+        """
+        print("Starting RAG pipeline indexing process (backend)...")
 
         if not self.embeddings:
             print("Embeddings not initialized. Exiting indexing.")
             return
 
-        print("Creating FAISS vector store from documents...")
-        try:
-            self.vector_store = FAISS.from_documents(langchain_documents, self.embeddings)
-            print("FAISS vector store created successfully.")
-        except Exception as e:
-            print(f"Error creating FAISS vector store: {e}")
+        total = await self._count_wines()
+        if not total:
+            print("No wine data loaded from database. Exiting indexing.")
             return
-            
-        print(f"Saving FAISS index to: {self.faiss_index_path}...")
+
+        print(f"Creating FAISS vector store from {total} wines...")
+        os.makedirs(self.faiss_index_path, exist_ok=True)
         try:
-            # Ensure the directory exists
-            os.makedirs(os.path.dirname(self.faiss_index_path), exist_ok=True)
-            self.vector_store.save_local(self.faiss_index_path)
-            print(f"FAISS index saved successfully to {self.faiss_index_path}")
+            with tempfile.TemporaryDirectory(prefix="build-", dir=self.faiss_index_path) as build_dir:
+                index, docstore_path = await self._build_index(total, build_dir, workers, shard_size)
+                print("FAISS vector store created successfully.")
+                print(f"Saving FAISS index to: {self.faiss_index_path}...")
+                self._save_vector_store(index, docstore_path)
+                print(f"FAISS index saved successfully to {self.faiss_index_path}")
         except Exception as e:
-            print(f"Error saving FAISS index: {e}")
+            print(f"Error creating FAISS vector store: {e}")
             return
-            
+
+        self.load_vector_store()
         print("RAG pipeline indexing process completed.")
 
+    def _embed_documents(self, documents):
+        """Embeds the documents' page_content, through the embedding cache when one is configured."""
+        return self._embed_texts([doc.page_content for doc in documents])
+
+    def _embed_texts(self, texts):
+        return embed_texts(texts, [content_hash(text) for text in texts], self.embeddings.embed_documents,
+                           self.embedding_cache)
+
+    def _write_template_index(self, texts, total, path):
+        """
+        Writes the empty index every shard starts from. An IVF index is trained
+        first, on a sample of the first shard; with the embedding cache the shard
+        then reuses the sample's vectors.
+        """
+        sample_size = training_sample_size(total) if self.faiss_mmap else 1
+        sample = texts[::max(1, len(texts) // sample_size)][:sample_size]
+        sample_vectors, sample_stats = self._embed_texts(sample)
+        print(f"Training sample: {sample_stats}")
+        write_index(new_index(sample_vectors, total, mmap=self.faiss_mmap), path)
+
+    async def _build_index(self, total, build_dir, workers, shard_size):
+        """
+        Builds the index and a new docstore in `build_dir` from the streamed wines
+        (see app/rag/index_build.py). FAISS ids are the wine ids, so update_index
+        can replace single wines later. Returns the merged index and the docstore path.
+        """
+        shard_count = -(-total // shard_size)
+        progress = BuildProgress(total, shard_count)
+        shards = asyncio.Queue(maxsize=INDEX_BUILD_QUEUE_SIZE)
+        producer = asyncio.create_task(self._produce_document_shards(shards, shard_size))
+        builder = ShardBuilder(
+            min(workers, shard_count), progress, self.embeddings.embed_documents, self.embedding_cache,
+            self.embedding_model_name, self.embedding_batch_size, self.embedding_cache_path,
+        )
+        # The docstore is written as shards arrive, always from the same thread (its connection's)
+        docstore_thread = ThreadPoolExecutor(max_workers=1)
+        loop = asyncio.get_running_loop()
+        docstore = await loop.run_in_executor(docstore_thread, SQLiteDocstore, os.path.join(build_dir, DOCSTORE_FILENAME))
+        template_path = os.path.join(build_dir, "template.faiss")
+        try:
+            shard_no = 0
+            while (documents := await shards.get()) is not None:
+                texts = [doc.page_content for doc in documents]
+                wine_ids = [int(doc.metadata["source_db_id"]) for doc in documents]
+                if shard_no == 0:
+                    await asyncio.to_thread(self._write_template_index, texts, total, template_path)
+                await loop.run_in_executor(
+                    docstore_thread, docstore.add_indexed, [(wine_id, str(wine_id), doc) for wine_id, doc in zip(wine_ids, documents)]
+                )
+                await builder.submit(ShardTask(
+                    shard_no, texts, wine_ids, template_path, os.path.join(build_dir, f"shard-{shard_no:04d}.faiss")
+                ))
+                shard_no += 1
+            await producer # Re-raises a database error
+            results = await builder.finish()
+        finally:
+            producer.cancel()
+            builder.close()
+            await loop.run_in_executor(docstore_thread, docstore.close)
+            docstore_thread.shutdown()
+
+        index = await asyncio.to_thread(merge_indexes, [result.output_path for result in results])
+        print(f"Embedded and indexed {progress.done_docs} documents in {len(results)} shards "
+              f"at {progress.docs_per_second:.0f} docs/s. Embeddings: {progress.embedding}")
+        return index, docstore.path
+
+    def _save_vector_store(self, index, docstore_path):
+        """
+        Publishes a freshly built index and docstore (see app/rag/docstore.py) as
+        index.faiss and docstore.sqlite. Unlike save_local, nothing is pickled.
+        """
+        with index_write_lock(self.faiss_index_path):
+            os.replace(docstore_path, os.path.join(self.faiss_index_path, DOCSTORE_FILENAME))
+            write_index(index, os.path.join(self.faiss_index_path, INDEX_FILENAME))
+        legacy_pickle = os.path.join(self.faiss_index_path, "index.pkl")
+        if os.path.exists(legacy_pickle):
+            os.remove(legacy_pickle)
+
+    def update_index(self, wine_data_list, deleted_ids):
+        """
+        Applies catalog changes to the persisted index in place: wines in
+        `wine_data_list` are upserted, `deleted_ids` removed. Only wines whose
+        embedded text changed (by content hash) are re-embedded; for the rest
+        just the stored metadata is refreshed. Blocking; run it in a thread.
+
+        The index is modified in memory and swapped in atomically under
+        index_write_lock. It is only read from disk when the file changed since
+        this pipeline last wrote it (first batch, or a full rebuild meanwhile).
+        Workers pick it up through index_changed().
+        """
+        index_path = os.path.join(self.faiss_index_path, INDEX_FILENAME)
+        with index_write_lock(self.faiss_index_path):
+            docstore = open_docstore(os.path.join(self.faiss_index_path, DOCSTORE_FILENAME), readonly=False)
+            if docstore is None or not os.path.exists(index_path):
+                raise RuntimeError(f"No FAISS index at {self.faiss_index_path}. Run full indexing first.")
+            try:
+                documents = {str(wine["id"]): self._create_wine_document(wine) for wine in wine_data_list}
+                stored_hashes = docstore.content_hashes(documents.keys())
+                changed = {doc_id: doc for doc_id, doc in documents.items()
+                           if stored_hashes.get(doc_id) != content_hash(doc.page_content)}
+                removed = list(docstore.content_hashes(str(wine_id) for wine_id in deleted_ids))
+                embedding_stats = EmbeddingStats()
+
+                if changed or removed:
+                    if self._writable_index is not None and self._writable_index_version == index_version(index_path):
+                        index = self._writable_index
+                    else:
+                        index = read_index(index_path, mmap=False) # Writable in-memory copy
+                    self._writable_index = None # Kept again only once written; a failed batch leaves no half-modified copy
+                    index.remove_ids(np.asarray([int(doc_id) for doc_id in [*changed, *removed]], dtype="int64"))
+                    if changed:
+                        vectors, embedding_stats = self._embed_documents(list(changed.values()))
+                        index.add_with_ids(
+                            vectors,
+                            np.asarray([int(doc_id) for doc_id in changed], dtype="int64"),
+                        )
+                        FaissIdMap(docstore).update({int(doc_id): doc_id for doc_id in changed})
+                    # New documents go in before the index that points at them, removed
+                    # ones come out after it; searches skip ids they can't resolve.
+                    docstore.add(documents)
+                    write_index(index, index_path)
+                    self._writable_index, self._writable_index_version = index, index_version(index_path)
+                    docstore.delete(removed)
+                else:
+                    docstore.add(documents)
+            finally:
+                docstore.close()
+
+        return {
+            "embedded": len(changed),
+            "embedding_cache_hits": embedding_stats.hits,
+            "metadata_only": len(documents) - len(changed),
+            "deleted": len(removed),
+        }
+
+    def indexed_content_hashes(self):
+        """Content hash per indexed wine id, for reconciliation against the wines table (None if no index)."""
+        docstore = open_docstore(os.path.join(self.faiss_index_path, DOCSTORE_FILENAME))
+        if docstore is None:
+            return None
+        try:
+            return {int(doc_id): digest for doc_id, digest in docstore.content_hashes().items()}
+        finally:
+            docstore.close()
+
+    def document_content_hash(self, wine):
+        return content_hash(self._create_wine_document(wine).page_content)
+
     def load_vector_store(self):
         """Loads the FAISS index from local storage using path from constructor."""
         if not self.embeddings:
@@ -148,13 +370,21 @@ class RAGPipeline:
                 return False
 
         if os.path.exists(self.faiss_index_path) and os.path.exists(os.path.join(self.faiss_index_path, "index.faiss")):
-            print(f"Loading FAISS index from: {self.faiss_index_path}...")
+            print(f"Loading FAISS index from: {self.faiss_index_path} (mmap={self.faiss_mmap})...")
             try:
-                self.vector_store = FAISS.load_local(
-                    self.faiss_index_path, 
-                    self.embeddings, 
-                    allow_dangerous_deserialization=True
-                )
+                docstore = open_docstore(os.path.join(self.faiss_index_path, DOCSTORE_FILENAME))
+                if docstore is None:
+                    print(f"No {DOCSTORE_FILENAME} in {self.faiss_index_path} (index built by an older version "
+                          "with a pickled docstore). Re-run indexing.")
+                    self.vector_store = None
+                    return False
+                # With mmap the index is mapped read-only instead of copied into
+                # this worker's memory; documents are read from the docstore per hit.
+                index_path = os.path.join(self.faiss_index_path, INDEX_FILENAME)
+                loaded_version = index_version(index_path) # Taken first: a swap during the read triggers a reload
+                index = read_index(index_path, mmap=self.faiss_mmap)
+                self.vector_store = FAISS(self.embeddings, index, docstore, FaissIdMap(docstore))
+                self.loaded_index_version = loaded_version
                 print("FAISS index loaded successfully.")
                 return True
             except Exception as e:
@@ -166,6 +396,45 @@ class RAGPipeline:
             self.vector_store = None
             return False
 
+    def index_changed(self):
+        """True if index.faiss on disk was replaced (rebuilt or updated) since it was loaded."""
+        return index_version(os.path.join(self.faiss_index_path, INDEX_FILENAME)) != self.loaded_index_version
+
+    def _embed_query(self, user_query):
+        """
+        Embedding of the normalized question, from the query embedding cache when
+        the same question was asked recently. Embeddings depend only on the text
+        and the model, so entries stay valid across index rebuilds.
+        """
+        key = normalize_query(user_query)
+        vector = self.query_embedding_cache.get(key)
+        if vector is None:
+            start = time.perf_counter()
+            vector = self.embeddings.embed_query(key)
+            self.query_embedding_cache.put(key, vector, time.perf_counter() - start)
+        return vector
+
+    def _search_documents(self, query_embedding, k):
+        """
+        Top-k documents for a query vector. Ids that no longer resolve (wines deleted
+        after this worker loaded the index) are skipped instead of failing the query.
+        """
+        vector_store = self.vector_store # One consistent store even if a reload swaps it meanwhile
+        _, faiss_ids = vector_store.index.search(np.asarray([query_embedding], dtype="float32"), k)
+        documents = []
+        for faiss_id in faiss_ids[0]:
+            if faiss_id == -1:
+                continue
+            doc_id = vector_store.index_to_docstore_id.get(int(faiss_id))
+            document = vector_store.docstore.search(doc_id) if doc_id is not None else None
+            if isinstance(document, Document):
+                documents.append(document)
+        return documents
+
+    async def _run_in_retrieval_pool(self, func, *args):
+        """Runs blocking retrieval work on the retrieval pool, keeping the event loop free."""
+        return await asyncio.get_running_loop().run_in_executor(self.retrieval_executor, func, *args)
+
     def _initialize_qa_chain(self):
         """Initializes the RetrievalQA chain using LLM name from constructor and a custom prompt."""
         if not self.vector_store:
@@ -227,35 +496,147 @@ class RAGPipeline:
             print(f"Error during RetrievalQA chain creation with custom prompt: {e}") # Added custom prompt note
             return False
 
-    async def query(self, user_query: str): # Changed to async def
-        """Queries the RAG pipeline with a user question."""
+    async def _ensure_ready(self):
+        """Loads the vector store and QA chain if needed and picks up a changed index. Returns an error or None."""
         if not self.qa_chain:
             print("QA chain not initialized. Attempting to load vector store and initialize chain.")
             # These are synchronous calls, which is generally fine if they are not too long-running.
             # If FAISS loading or chain initialization becomes a bottleneck, they might need async versions
             # or to be run in a thread pool executor.
             if not self.load_vector_store():
-                return {"error": "Failed to load vector store. Cannot query."}
+                return "Failed to load vector store. Cannot query."
             if not self._initialize_qa_chain():
-                return {"error": "Failed to initialize QA chain. Cannot query."}
-        
+                return "Failed to initialize QA chain. Cannot query."
+
+        if self.index_changed():
+            async with self._reload_lock:
+                # Queries that noticed the same change waited here; the first one reloaded
+                if self.index_changed():
+                    print("FAISS index changed on disk, reloading...")
+                    await asyncio.to_thread(self.load_vector_store)
+        return None
+
+    @staticmethod
+    def _serialize_sources(source_documents):
+        return [
+            {
+                "page_content": doc.page_content,
+                "metadata": doc.metadata
+            } for doc in source_documents
+        ]
+
+    async def query(self, user_query: str): # Changed to async def
+        """
+        Queries the RAG pipeline with a user question. Concurrent calls with the same
+        normalized question share one retrieval + LLM run and all get its result.
+        """
+        key = normalize_query(user_query)
+        in_flight = self._queries_in_flight.get(key)
+        if in_flight is not None:
+            RAG_QUERIES_COALESCED.inc()
+        else:
+            in_flight = self._queries_in_flight[key] = asyncio.ensure_future(self._execute_query(user_query))
+            in_flight.add_done_callback(
+                lambda task: self._queries_in_flight.pop(key) if self._queries_in_flight.get(key) is task else None
+            )
+        # Shielded: a caller that goes away (client disconnect) cancels its own wait,
+        # not the run the other callers are waiting on
+        return await asyncio.shield(in_flight)
+
+    async def _execute_query(self, user_query: str):
+        error = await self._ensure_ready()
+        if error:
+            return {"error": error}
+
         print(f"Received query for RAG pipeline: {user_query}") # Clarified print
         try:
-            result = await self.qa_chain.ainvoke({"query": user_query})
-            
-            return {
-                "answer": result.get("result"),
-                "source_documents": [
-                    {
-                        "page_content": doc.page_content,
-                        "metadata": doc.metadata
-                    } for doc in result.get("source_documents", []) # Use the already fetched docs
-                ]
+            # The retrieval steps RetrievalQA would run internally are done here
+            # one at a time, so each stage can be timed on its own.
+            with stage_timer("embedding"):
+                query_embedding = await self._run_in_retrieval_pool(self._embed_query, user_query)
+
+            # A near-identical question against the same index gets the same answer
+            index_version = self.loaded_index_version
+            cached = self.answer_cache.get(query_embedding, index_version)
+            if cached is not None:
+                RAG_QUERIES.labels("success").inc()
+                return cached.response
+
+            start = time.perf_counter()
+            with stage_timer("faiss_search"):
+                source_documents = await self._run_in_retrieval_pool(self._search_documents, query_embedding, RETRIEVER_K)
+            with stage_timer("llm"):
+                result = await self.qa_chain.combine_documents_chain.ainvoke(
+                    {"input_documents": source_documents, "question": user_query}
+                )
+            RAG_QUERIES.labels("success").inc()
+
+            response = {
+                "answer": result.get("output_text"),
+                "source_documents": self._serialize_sources(source_documents),
             }
+            self.answer_cache.put(query_embedding, index_version, user_query, response, time.perf_counter() - start)
+            return response
         except Exception as e:
+            RAG_QUERIES.labels("error").inc()
             print(f"Error during QA chain execution: {e}")
             return {"error": f"Error processing query: {e}"}
 
+    async def query_stream(self, user_query: str):
+        """
+        Streaming variant of query(), as (event, data) pairs: ("sources", [...])
+        as soon as retrieval is done, then ("token", text) for each chunk the LLM
+        produces, then ("done", None). Failures end the stream with ("error", message).
+        """
+        error = await self._ensure_ready()
+        if error:
+            yield "error", error
+            return
+
+        print(f"Received streaming query for RAG pipeline: {user_query}")
+        try:
+            with stage_timer("embedding"):
+                query_embedding = await self._run_in_retrieval_pool(self._embed_query, user_query)
+
+            index_version = self.loaded_index_version
+            cached = self.answer_cache.get(query_embedding, index_version)
+            if cached is not None:
+                RAG_QUERIES.labels("success").inc()
+                yield "sources", cached.response["source_documents"]
+                yield "token", cached.response["answer"]
+                yield "done", None
+                return
+
+            start = time.perf_counter()
+            with stage_timer("faiss_search"):
+                source_documents = await self._run_in_retrieval_pool(self._search_documents, query_embedding, RETRIEVER_K)
+            sources = self._serialize_sources(source_documents)
+            yield "sources", sources
+
+            # Same prompt the QA chain's "stuff" step builds, sent to the LLM with streaming
+            chain = self.qa_chain.combine_documents_chain
+            prompt = chain.llm_chain.prompt.format_prompt(**{
+                chain.document_variable_name: chain.document_separator.join(
+                    format_document(doc, chain.document_prompt) for doc in source_documents
+                ),
+                "question": user_query,
+            })
+            answer_parts = []
+            with stage_timer("llm"):
+                async for chunk in chain.llm_chain.llm.astream(prompt):
+                    if chunk.content:
+                        answer_parts.append(chunk.content)
+                        yield "token", chunk.content
+            RAG_QUERIES.labels("success").inc()
+
+            response = {"answer": "".join(answer_parts), "source_documents": sources}
+            self.answer_cache.put(query_embedding, index_version, user_query, response, time.perf_counter() - start)
+            yield "done", None
+        except Exception as e:
+            RAG_QUERIES.labels("error").inc()
+            print(f"Error during streaming QA chain execution: {e}")
+            yield "error", f"Error processing query: {e}"
+
 # Example usage (for testing, not typically run from here in production)
 # if __name__ == '__main__':
 #     # This part would need to be adapted to run an async function,
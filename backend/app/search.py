@@ -0,0 +1,117 @@
+import difflib
+import re
+from typing import Dict, List
+
+from sqlalchemy import func, literal_column, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+# Fields searched by the in-Python fallback, with the same weights as the
+# Postgres tsvector (A=1.0, B=0.4, C=0.2 mirrors ts_rank's default weights).
+FALLBACK_FIELD_WEIGHTS = {
+    "name": 1.0,
+    "producer": 1.0,
+    "varietal": 0.4,
+    "description": 0.2,
+    "food_pairing": 0.2,
+}
+TRIGRAM_SIMILARITY_THRESHOLD = 0.3  # pg_trgm's default for the % operator
+FALLBACK_FUZZY_CUTOFF = 0.8
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# What this Postgres database offers, probed on the first search in each worker
+# (restart the workers after running migrate_db.py or installing pg_trgm)
+_postgres_features: Dict[str, bool] = {}
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+async def search_wines(db: AsyncSession, q: str, limit: int) -> List[models.Wine]:
+    """
+    Ranks wines against a free-text query. On Postgres this uses the stored,
+    GIN-indexed wines.search_vector column and falls back to trigram similarity
+    on the name when the full-text search finds nothing (typos). Other dialects
+    use a pure-Python ranking.
+    """
+    if db.bind.dialect.name == "postgresql":
+        features = await _probe_postgres_features(db)
+        wines = await _search_postgres_fulltext(db, q, limit, features["search_vector"])
+        if not wines and features["trigram"]:
+            wines = await _search_postgres_trigram(db, q, limit)
+        return wines
+    return await _search_python(db, q, limit)
+
+
+async def _probe_postgres_features(db: AsyncSession) -> Dict[str, bool]:
+    if not _postgres_features:
+        row = (await db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'), "
+            "EXISTS (SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'wines' AND column_name = 'search_vector')"
+        ))).one()
+        _postgres_features.update(trigram=row[0], search_vector=row[1])
+        if not row[1]:
+            print("wines.search_vector is missing; search computes it per row until `python migrate_db.py` is run.")
+    return _postgres_features
+
+
+async def _search_postgres_fulltext(db: AsyncSession, q: str, limit: int, stored_vector: bool) -> List[models.Wine]:
+    vector = models.wine_search_vector(stored=stored_vector)
+    tsquery = func.websearch_to_tsquery(literal_column("'english'::regconfig"), q)
+    rank = func.ts_rank_cd(vector, tsquery)
+    result = await db.execute(
+        select(models.Wine)
+        .where(vector.op("@@")(tsquery))
+        .order_by(rank.desc(), models.Wine.id)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def _search_postgres_trigram(db: AsyncSession, q: str, limit: int) -> List[models.Wine]:
+    similarity = func.similarity(models.Wine.name, q)
+    result = await db.execute(
+        select(models.Wine)
+        .where(models.Wine.name.op("%")(q))  # Uses ix_wines_name_trgm
+        .order_by(similarity.desc(), models.Wine.id)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def _search_python(db: AsyncSession, q: str, limit: int) -> List[models.Wine]:
+    """Scores every wine in Python. Only meant for SQLite test and dev databases."""
+    query_tokens = set(_tokenize(q))
+    if not query_tokens:
+        return []
+
+    columns = [getattr(models.Wine, field) for field in FALLBACK_FIELD_WEIGHTS]
+    result = await db.execute(select(models.Wine.id, *columns))
+
+    scores = []
+    for row in result.all():
+        score = 0.0
+        for field, weight in FALLBACK_FIELD_WEIGHTS.items():
+            value = getattr(row, field)
+            if not value:
+                continue
+            field_tokens = set(_tokenize(value))
+            for token in query_tokens:
+                if token in field_tokens:
+                    score += weight
+                elif difflib.get_close_matches(token, field_tokens, n=1, cutoff=FALLBACK_FUZZY_CUTOFF):
+                    score += weight / 2
+        if score > 0:
+            scores.append((score, row.id))
+
+    scores.sort(key=lambda s: (-s[0], s[1]))
+    top_ids = [wine_id for _, wine_id in scores[:limit]]
+    if not top_ids:
+        return []
+    wines = await db.execute(select(models.Wine).where(models.Wine.id.in_(top_ids)))
+    by_id = {wine.id: wine for wine in wines.scalars().all()}
+    return [by_id[wine_id] for wine_id in top_ids]
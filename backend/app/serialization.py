@@ -0,0 +1,81 @@
+from functools import lru_cache
+from typing import Callable, Iterable, Optional, Sequence, Tuple
+
+import orjson
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from sqlalchemy import select
+
+from app import models
+from app.wine_app_schemas import Wine
+
+RowEncoder = Callable[[Sequence], bytes]
+
+WINE_COLUMNS = tuple(models.Wine.__table__.columns)
+WINE_FIELD_NAMES = tuple(column.name for column in WINE_COLUMNS)
+
+# Large Text columns that list cards never show. List views leave them out
+# unless asked for with `fields=`; detail views return every field.
+DEFERRED_LIST_FIELDS = ("description", "food_pairing")
+LIST_DEFAULT_FIELDS = tuple(name for name in WINE_FIELD_NAMES if name not in DEFERRED_LIST_FIELDS)
+ALL_FIELDS_TOKENS = ("all", "*")
+
+
+def make_row_encoder(keys: Sequence[str]) -> RowEncoder:
+    """
+    Precompiles an encoder for Core rows with a fixed column order. The keys are
+    bound once, so encoding a page is a zip per row plus one orjson call, with
+    no ORM identity map and no Pydantic validation in between.
+    """
+    keys = tuple(keys)
+
+    def encode(rows: Sequence) -> bytes:
+        return orjson.dumps([dict(zip(keys, row)) for row in rows])
+
+    return encode
+
+
+def wine_rows_select(fields: Sequence[str] = WINE_FIELD_NAMES):
+    """Column-only select over the wines table, in the order of `fields`."""
+    return select(*(models.Wine.__table__.c[name] for name in fields))
+
+
+def parse_fields(fields: Optional[str], default: Sequence[str], always: Iterable[str] = ("id",)) -> Tuple[str, ...]:
+    """
+    Resolves a comma-separated `fields=` parameter into column names in table
+    order. `always` (the id, and the sort key for lists) is always included.
+    Raises ValueError for unknown names.
+    """
+    if fields is None:
+        requested = set(default)
+    elif fields.strip() in ALL_FIELDS_TOKENS:
+        requested = set(WINE_FIELD_NAMES)
+    else:
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = requested - set(WINE_FIELD_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.update(always)
+    return tuple(name for name in WINE_FIELD_NAMES if name in requested)
+
+
+@lru_cache(maxsize=128)
+def wine_fields_model(fields: Tuple[str, ...]) -> type[BaseModel]:
+    """Trimmed copy of wine_app_schemas.Wine holding only `fields`, with the same field types."""
+    if fields == WINE_FIELD_NAMES:
+        return Wine
+    definitions = {
+        name: (Wine.model_fields[name].annotation, Wine.model_fields[name]) for name in fields
+    }
+    return create_model(
+        "WineFields", __config__=ConfigDict(from_attributes=True), **definitions
+    )
+
+
+@lru_cache(maxsize=128)
+def wine_fields_list_adapter(fields: Tuple[str, ...]) -> TypeAdapter:
+    return TypeAdapter(list[wine_fields_model(fields)])
+
+
+@lru_cache(maxsize=128)
+def wine_fields_row_encoder(fields: Tuple[str, ...]) -> RowEncoder:
+    return make_row_encoder(fields)
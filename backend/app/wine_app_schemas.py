@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 
 class WineBase(BaseModel):
     name: str
@@ -42,6 +42,40 @@ class WineUpdate(WineBase):
     size: Optional[str] = None
     source: Optional[str] = None
 
+class WineBulkUpdate(WineUpdate):
+    id: int
+
+class WineIds(BaseModel):
+    ids: List[int]
+
+class BulkItemResult(BaseModel):
+    index: int # Position of the record in the request
+    id: Optional[int] = None # The wine's id; None for records that were not applied
+    status: Literal["created", "updated", "deleted", "not_found", "error"]
+    detail: Optional[str] = None # Why a record was not applied
+
+class BulkResult(BaseModel):
+    count: int # Records applied
+    results: List[BulkItemResult] # One per record, in request order
+
 class Wine(WineBase):
     id: int
+    version: int = 1 # Send back in If-Match for optimistic concurrency
     model_config = ConfigDict(from_attributes=True)
+
+class WineListItem(WineUpdate):
+    """
+    A wine in a GET /wines/ list. Only the fields asked for with `fields=` are
+    present, plus id and the sort key; by default every field except
+    description and food_pairing.
+    """
+    id: int
+    version: Optional[int] = None
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+class WineFacets(BaseModel):
+    # Keyed by facet name (type, country, region, varietal, body_type)
+    facets: Dict[str, List[FacetCount]]
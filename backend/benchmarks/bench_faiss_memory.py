@@ -0,0 +1,86 @@
+"""
+Resident memory of N worker processes holding the FAISS index, with and
+without memory-mapping (see app/rag/faiss_io.py). Each worker loads the index,
+touches it with a search, then reports RSS and PSS (proportional set size,
+which splits shared pages between the processes mapping them). PSS summed over
+workers is the real memory cost on the host. Linux only (reads /proc).
+
+Uses the real index by default; pass --synthetic N to build a throwaway one:
+
+    python benchmarks/bench_faiss_memory.py --workers 1 4
+    python benchmarks/bench_faiss_memory.py --synthetic 100000 --workers 1 4
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import faiss
+import numpy as np
+
+from app.rag.config import FAISS_INDEX_PATH
+from app.rag.faiss_io import build_index, read_index
+
+
+def _memory_kb() -> tuple[int, int]:
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0]] = int(parts[1])
+    return values["Rss:"], values["Pss:"]
+
+
+def _worker(path: str, mmap: bool, loaded: multiprocessing.Barrier, results: multiprocessing.Queue):
+    index = read_index(path, mmap=mmap)
+    index.search(np.random.rand(4, index.d).astype("float32"), 10)  # Fault the pages in
+    loaded.wait()  # Measure only once every worker has the index, so sharing is visible
+    results.put(_memory_kb())
+    loaded.wait()
+
+
+def _measure(path: str, mmap: bool, workers: int) -> tuple[int, int]:
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(workers), context.Queue()
+    processes = [context.Process(target=_worker, args=(path, mmap, barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in range(workers)]
+    for process in processes:
+        process.join()
+    return sum(rss for rss, _ in samples), sum(pss for _, pss in samples)
+
+
+def _build_synthetic(count: int, dim: int, directory: str) -> str:
+    vectors = np.random.rand(count, dim).astype("float32")
+    path = os.path.join(directory, "index.faiss")
+    faiss.write_index(build_index(vectors, range(count), mmap=True), path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure FAISS index memory across worker processes.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--synthetic", type=int, default=0, help="Build a synthetic index with this many vectors.")
+    parser.add_argument("--dim", type=int, default=384, help="Vector size for --synthetic (all-MiniLM-L6-v2 is 384).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            path = _build_synthetic(args.synthetic, args.dim, tmp)
+        else:
+            path = os.path.join(FAISS_INDEX_PATH, "index.faiss")
+        print(f"Index: {path} ({os.path.getsize(path) / 2**20:.1f} MiB on disk)")
+        print(f"{'mode':<8} {'workers':>7} {'sum RSS MiB':>12} {'sum PSS MiB':>12}")
+        for mmap in (False, True):
+            for workers in args.workers:
+                rss, pss = _measure(path, mmap, workers)
+                print(f"{'mmap' if mmap else 'private':<8} {workers:>7} {rss / 1024:>12.1f} {pss / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Measures GET /wines/ latency while the sommelier endpoint is saturated, to check
+that RAG retrieval (query embedding + FAISS search) does not stall the event loop.
+
+Three phases, each `--duration` seconds, all against one in-process app:
+
+  * idle:      /wines/ alone
+  * pool:      /wines/ with `--sommelier-concurrency` clients hammering /query,
+               retrieval on RAGPipeline's retrieval pool (what the app does)
+  * inline:    the same load, retrieval called directly on the event loop (the
+               old behaviour), for comparison
+
+The LLM call is replaced by a fixed `--llm-latency` sleep, so no OpenAI key is
+needed and only retrieval competes with the catalog. The embedding model is the
+real one (sentence-transformers must be installed); `--model` also takes a local
+sentence-transformers directory. Run from the backend directory:
+
+    python benchmarks/bench_sommelier_load.py --wines 2000 --sommelier-concurrency 16
+
+The catalog cache is turned off (CATALOG_CACHE_MAX_ENTRIES=0), so every probe
+goes through the database session pool and serialization, as a cache miss would.
+The load clients run on the same event loop as the app, so part of the "pool"
+p99 rise over "idle" is the benchmark's own request handling; the rest is the
+retrieval threads sharing the CPU with the loop (see RETRIEVAL_WORKERS).
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# The app settings require these; the benchmark uses its own SQLite database.
+BENCH_DIR = tempfile.mkdtemp(prefix="bench-sommelier-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(BENCH_DIR, 'bench.db')}")
+os.environ.setdefault("OPENAI_API_KEY", "unused-by-benchmark")
+# Every probe is the same GET /wines/ with no writes in between; with the catalog
+# cache on, all but the first would be LRU hits and measure nothing but the cache
+os.environ.setdefault("CATALOG_CACHE_MAX_ENTRIES", "0")
+
+import httpx
+from sqlalchemy import insert
+
+from app import models
+from app.api.endpoints import rag as rag_router
+from app.database import Base, engine
+from app.main import app
+from app.rag.config import EMBEDDING_MODEL_NAME, RETRIEVAL_WORKERS
+from app.rag.rag_pipeline import RAGPipeline
+
+QUESTIONS = [
+    "Which wine goes well with raclette",
+    "A light red for grilled fish",
+    "Something sparkling for a birthday under 30",
+    "A white wine for spicy Thai food",
+]
+
+
+def _sample_wine(i: int) -> dict:
+    return {
+        "name": f"Benchmark Wine {i}",
+        "type": ("Red", "White", "Rosé", "Sparkling")[i % 4],
+        "varietal": ("Pinot Noir", "Chasselas", "Gamay", "Chardonnay")[i % 4],
+        "region": "Valais",
+        "country": "Switzerland",
+        "price": 10.0 + i % 90,
+        "description": "A fresh, fruity wine with notes of cherry and a long finish.",
+        "food_pairing": "Raclette, fondue, grilled fish",
+    }
+
+
+class _SleepingLLMChain:
+    """Stands in for the QA chain's LLM step: a fixed-latency await, like a remote API call."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def ainvoke(self, inputs):
+        await asyncio.sleep(self.latency)
+        return {"output_text": f"Try {inputs['input_documents'][0].metadata.get('name')}."}
+
+
+async def _setup(args) -> RAGPipeline:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(models.Wine), [_sample_wine(i) for i in range(args.wines)])
+
+    pipeline = RAGPipeline(
+        openai_api_key="unused-by-benchmark",
+        faiss_index_path=os.path.join(BENCH_DIR, "index"),
+        embedding_model_name=args.model,
+        embedding_cache_path=None,
+        retrieval_workers=args.retrieval_workers,
+    )
+    await pipeline.run_indexing(workers=1)
+    # Every sommelier request must embed and search, so the caches stay off
+    pipeline.query_embedding_cache.max_entries = 0
+    pipeline.answer_cache.max_entries = 0
+    pipeline.qa_chain = types.SimpleNamespace(combine_documents_chain=_SleepingLLMChain(args.llm_latency))
+    rag_router.rag_pipeline_instance = pipeline
+    return pipeline
+
+
+async def _sommelier_client(client: httpx.AsyncClient, client_no: int, stop: asyncio.Event, counter: list):
+    i = 0
+    while not stop.is_set():
+        # Distinct questions, so nothing is served from a cache
+        question = f"{QUESTIONS[i % len(QUESTIONS)]} (client {client_no}, request {i})"
+        response = await client.post("/api/ai-sommelier/query", json={"question": question})
+        response.raise_for_status()
+        counter[0] += 1
+        i += 1
+
+
+async def _phase(client: httpx.AsyncClient, duration: float, sommelier_clients: int) -> tuple[list[float], int]:
+    stop = asyncio.Event()
+    counter = [0]
+    load = [asyncio.create_task(_sommelier_client(client, n, stop, counter)) for n in range(sommelier_clients)]
+    await asyncio.sleep(0.5 if sommelier_clients else 0) # Let the load ramp up
+
+    latencies = []
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        response = await client.get("/wines/", params={"limit": 20})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01) # A steady trickle of catalog traffic, not a second flood
+
+    stop.set()
+    await asyncio.gather(*load)
+    return latencies, counter[0]
+
+
+def _report(label: str, latencies: list[float], sommelier_requests: int, duration: float):
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    print(f"{label:<8} /wines/ p50 {cuts[49] * 1000:7.1f} ms   p99 {cuts[98] * 1000:7.1f} ms   "
+          f"max {max(latencies) * 1000:7.1f} ms   ({len(latencies)} requests, "
+          f"sommelier {sommelier_requests / duration:5.1f} req/s)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark /wines/ latency under sommelier load.")
+    parser.add_argument("--wines", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per phase.")
+    parser.add_argument("--sommelier-concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds the stand-in LLM call takes.")
+    parser.add_argument("--retrieval-workers", type=int, default=RETRIEVAL_WORKERS)
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    args = parser.parse_args()
+
+    try:
+        pipeline = await _setup(args)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            latencies, _ = await _phase(client, args.duration, 0)
+            _report("idle", latencies, 0, args.duration)
+
+            latencies, requests = await _phase(client, args.duration, args.sommelier_concurrency)
+            _report("pool", latencies, requests, args.duration)
+
+            async def run_inline(func, *func_args):
+                return func(*func_args)
+            pipeline._run_in_retrieval_pool = run_inline
+            latencies, requests = await _phase(client, args.duration, args.sommelier_concurrency)
+            _report("inline", latencies, requests, args.duration)
+        await engine.dispose()
+    finally:
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
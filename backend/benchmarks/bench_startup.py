@@ -0,0 +1,86 @@
+"""
+Measures how long the API takes to start:
+
+  * import:  `import app.main` in a fresh interpreter
+  * rag:     `import app.rag.rag_pipeline` in a fresh interpreter (what the
+             first sommelier request, or a warmup, pays on top)
+  * boot:    from spawning uvicorn until GET /health answers
+
+Run from the backend directory with the usual .env (or DATABASE_URL) in place:
+
+    python benchmarks/bench_startup.py --repeats 5
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _time_import(module: str) -> float:
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; "
+        "print(time.perf_counter() - start)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _time_boot(timeout: float) -> float:
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError(f"Server did not answer /health within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _report(label: str, samples: list[float]):
+    print(f"{label:<28} median {statistics.median(samples) * 1000:8.1f} ms   "
+          f"min {min(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API import and boot time.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--boot-timeout", type=float, default=60.0)
+    parser.add_argument("--skip-rag", action="store_true", help="Don't time the RAG stack import.")
+    args = parser.parse_args()
+
+    _report("import app.main", [_time_import("app.main") for _ in range(args.repeats)])
+    if not args.skip_rag:
+        try:
+            _report("import app.rag.rag_pipeline", [_time_import("app.rag.rag_pipeline") for _ in range(args.repeats)])
+        except subprocess.CalledProcessError as e:
+            print(f"import app.rag.rag_pipeline failed (RAG dependencies installed?): {e.stderr.strip().splitlines()[-1]}")
+    _report("uvicorn boot to /health", [_time_boot(args.boot_timeout) for _ in range(args.repeats)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Compares the two serialization paths of GET /wines/, as read_wines runs them:
+
+  * pydantic: Core rows of the selected columns validated and dumped by the
+              TypeAdapter of the trimmed Wine model (the default, fast=false)
+  * fast:     the same rows encoded straight to bytes by orjson (fast=true)
+
+Both paths run the endpoint's column-only, sorted query, so the numbers reflect
+what the endpoint pays. `--fields` takes the endpoint's `fields=` parameter
+(default: its default list shape; "all" for every column). Run from the
+backend directory:
+
+    python benchmarks/bench_wine_serialization.py --rows 10000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# The app settings require these; the benchmark uses its own SQLite database.
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("OPENAI_API_KEY", "unused-by-benchmark")
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.pagination import apply_sort
+from app.serialization import (
+    LIST_DEFAULT_FIELDS, parse_fields, wine_fields_list_adapter, wine_fields_row_encoder, wine_rows_select,
+)
+
+
+def _sample_wine(i: int) -> dict:
+    return {
+        "name": f"Benchmark Wine {i}",
+        "type": ("Red", "White", "Rosé", "Sparkling")[i % 4],
+        "varietal": "Pinot Noir",
+        "vintage": 2000 + i % 24,
+        "region": "Valais",
+        "country": "Switzerland",
+        "price": 10.0 + i % 90,
+        "description": "A fresh, fruity wine with notes of cherry and a long finish. " * 4,
+        "image_url": f"https://example.com/wines/{i}.jpg",
+        "producer": "Domaine Benchmark",
+        "food_pairing": "Raclette, fondue, grilled fish",
+        "body_type": "Medium",
+        "product_url": f"https://example.com/products/{i}",
+        "size": "75cl",
+        "source": "benchmark",
+    }
+
+
+async def _time_path(session_factory, columns: tuple, limit: int, fast: bool, repeats: int) -> list[float]:
+    timings = []
+    query = apply_sort(wine_rows_select(columns), "id").limit(limit)
+    for _ in range(repeats):
+        async with session_factory() as db:
+            start = time.perf_counter()
+            result = await db.execute(query)
+            wines = result.all()
+            if fast:
+                body = wine_fields_row_encoder(columns)(wines)
+            else:
+                adapter = wine_fields_list_adapter(columns)
+                body = adapter.dump_json(adapter.validate_python(wines, from_attributes=True))
+            timings.append(time.perf_counter() - start)
+            assert body
+    return timings
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark /wines/ serialization paths.")
+    parser.add_argument("--rows", type=int, default=10000, help="Number of wines to seed.")
+    parser.add_argument("--limits", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--fields", default=None, help="The endpoint's fields= parameter, e.g. 'all'.")
+    args = parser.parse_args()
+    columns = parse_fields(args.fields, default=LIST_DEFAULT_FIELDS, always=("id",))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+            await conn.execute(insert(models.Wine), [_sample_wine(i) for i in range(args.rows)])
+
+        print(f"{'limit':>7} {'pydantic p50 ms':>16} {'fast p50 ms':>12} {'speedup':>8}")
+        for limit in args.limits:
+            slow = await _time_path(session_factory, columns, limit, fast=False, repeats=args.repeats)
+            fast = await _time_path(session_factory, columns, limit, fast=True, repeats=args.repeats)
+            slow_ms = statistics.median(slow) * 1000
+            fast_ms = statistics.median(fast) * 1000
+            print(f"{limit:>7} {slow_ms:>16.2f} {fast_ms:>12.2f} {slow_ms / fast_ms:>7.1f}x")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
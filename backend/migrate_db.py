@@ -0,0 +1,42 @@
+"""
+Schema changes that are too expensive to run from every worker's startup.
+
+Adds the stored wines.search_vector column (Postgres only) to a database created
+before it existed. The ALTER TABLE rewrites the table and holds an ACCESS
+EXCLUSIVE lock while it does, blocking reads and writes of wines; the GIN index
+is then built CONCURRENTLY. Run it once per database, in a quiet period, then
+restart the app so search switches to the column. Safe to re-run.
+
+Run from the 'backend' directory:  python migrate_db.py
+"""
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.models import SEARCH_VECTOR_MIGRATION
+
+
+async def migrate_search_vector():
+    if engine.dialect.name != "postgresql":
+        print(f"Nothing to migrate on {engine.dialect.name}; search_vector only exists on Postgres.")
+        return
+    # CREATE/DROP INDEX CONCURRENTLY refuse to run inside a transaction block
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for statement in SEARCH_VECTOR_MIGRATION:
+            print(f"Running: {statement.split(' GENERATED')[0]}...")
+            start = time.perf_counter()
+            await conn.execute(text(statement))
+            print(f"  done in {time.perf_counter() - start:.1f}s")
+    print("search_vector migration complete. Restart the app workers to use the column.")
+
+
+async def main():
+    await migrate_search_vector()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
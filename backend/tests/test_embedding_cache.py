@@ -0,0 +1,29 @@
+import os
+
+import numpy as np
+
+from app.rag.embedding_cache import EmbeddingCache
+
+
+def _embed(texts):
+    return [[float(len(text)), 1.0, 2.0] for text in texts]
+
+
+def test_torn_append_is_ignored_and_overwritten(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "test-model")
+    cache.embed(["a", "bb"], ["h1", "h2"], _embed)
+
+    # An append interrupted after writing part of a row
+    with open(cache.vectors_path, "ab") as f:
+        f.write(b"\x00" * 6)
+
+    vectors, stats = cache.embed(["a", "bb", "ccc"], ["h1", "h2", "h3"], _embed)
+    assert stats.hits == 2 and stats.misses == 1
+    np.testing.assert_array_equal(vectors, np.asarray(_embed(["a", "bb", "ccc"]), dtype="float32"))
+
+    # The new row overwrote the torn bytes, so the file holds whole rows again
+    vectors, stats = cache.embed(["ccc"], ["h3"], _embed)
+    assert stats.hits == 1
+    np.testing.assert_array_equal(vectors[0], [3.0, 1.0, 2.0])
+    assert os.path.getsize(cache.vectors_path) == 3 * 3 * 4
+    cache.close()
@@ -1,9 +1,162 @@
-// This is a placeholder for the AI Sommelier page
-const AISommelierPage = () => {
+"use client";
+
+import React, { useState } from "react";
+import { formatPrice } from "@/lib/format";
+
+const API_BASE_URL = "http://localhost:8000";
+
+interface SourceWine {
+  page_content: string;
+  metadata: {
+    source_db_id?: number | string;
+    name?: string;
+    producer?: string;
+    type?: string;
+    price?: number;
+  };
+}
+
+// Reads the Server-Sent Events of /api/ai-sommelier/query/stream: one "sources"
+// event with the retrieved wines, then "token" events with pieces of the answer,
+// then "done" or "error". Frames are separated by a blank line.
+const streamSommelierAnswer = async (
+  question: string,
+  onSources: (sources: SourceWine[]) => void,
+  onToken: (token: string) => void
+): Promise<void> => {
+  const response = await fetch(`${API_BASE_URL}/api/ai-sommelier/query/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ question }),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) {
+      return;
+    }
+    buffer += decoder.decode(value, { stream: true });
+    let boundary = buffer.indexOf("\n\n");
+    while (boundary !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf("\n\n");
+
+      let event = "message";
+      let data = "";
+      for (const line of frame.split("\n")) {
+        if (line.startsWith("event: ")) {
+          event = line.slice("event: ".length);
+        } else if (line.startsWith("data: ")) {
+          data += line.slice("data: ".length);
+        }
+      }
+      const payload = data ? JSON.parse(data) : null;
+      if (event === "sources") {
+        onSources(payload);
+      } else if (event === "token") {
+        onToken(payload);
+      } else if (event === "error") {
+        throw new Error(payload);
+      } else if (event === "done") {
+        return;
+      }
+    }
+  }
+};
+
+const AISommelierPage: React.FC = () => {
+  const [question, setQuestion] = useState<string>("");
+  const [answer, setAnswer] = useState<string>("");
+  const [sources, setSources] = useState<SourceWine[]>([]);
+  const [isAsking, setIsAsking] = useState<boolean>(false);
+  const [queryError, setQueryError] = useState<string | null>(null);
+
+  const handleSubmit = async (event: React.FormEvent<HTMLFormElement>) => {
+    event.preventDefault();
+    if (question.trim() === "" || isAsking) {
+      return;
+    }
+    setIsAsking(true);
+    setQueryError(null);
+    setAnswer("");
+    setSources([]);
+
+    try {
+      await streamSommelierAnswer(
+        question,
+        setSources,
+        (token) => setAnswer((previous) => previous + token)
+      );
+    } catch (error) {
+      console.error("[AISommelierPage] Error streaming the sommelier answer:", error);
+      if (error instanceof Error) {
+        setQueryError(`The sommelier could not answer: ${error.message}`);
+      } else {
+        setQueryError("The sommelier could not answer due to an unknown error.");
+      }
+    } finally {
+      setIsAsking(false);
+    }
+  };
+
   return (
-    <div className="min-h-screen flex flex-col items-center justify-center p-4 md:p-8 lg:p-12 bg-background text-foreground">
-      <h1 className="text-3xl font-bold font-serif text-primary mb-4">AI Sommelier</h1>
-      <p className="text-lg text-secondary font-sans">Coming soon! Get personalized wine recommendations from our AI.</p>
+    <div className="container mx-auto px-4 py-8 max-w-3xl">
+      <h1 className="text-4xl font-serif text-primary mb-4 text-center">AI Sommelier</h1>
+      <p className="text-lg text-secondary font-sans mb-8 text-center">
+        Tell us about the occasion or the dish, and our AI will recommend wines from our collection.
+      </p>
+
+      <form onSubmit={handleSubmit} className="flex gap-2 mb-8">
+        <input
+          type="text"
+          value={question}
+          onChange={(event) => setQuestion(event.target.value)}
+          placeholder="Which wine goes well with raclette?"
+          className="flex-grow p-2 border border-secondary rounded-md shadow-sm focus:ring-primary focus:border-primary bg-card-background text-foreground"
+        />
+        <button
+          type="submit"
+          disabled={isAsking || question.trim() === ""}
+          className="px-4 py-2 rounded-md bg-primary text-white disabled:opacity-50"
+        >
+          {isAsking ? "Asking..." : "Ask"}
+        </button>
+      </form>
+
+      {queryError && <p className="text-red-600 mb-4">{queryError}</p>}
+
+      {(answer || isAsking) && (
+        <div className="mb-8 p-4 rounded-md bg-card-background shadow-sm">
+          <p className="whitespace-pre-wrap text-foreground">
+            {answer}
+            {isAsking && <span className="animate-pulse">▍</span>}
+          </p>
+        </div>
+      )}
+
+      {sources.length > 0 && (
+        <div>
+          <h2 className="text-2xl font-serif text-primary mb-4">Wines considered</h2>
+          <ul className="space-y-2">
+            {sources.map((source, index) => (
+              <li key={source.metadata.source_db_id ?? index} className="text-foreground">
+                <span className="font-semibold">{source.metadata.name ?? "Unnamed wine"}</span>
+                {source.metadata.producer && <span> by {source.metadata.producer}</span>}
+                {source.metadata.price !== undefined && (
+                  <span className="text-gray-600"> ({formatPrice(source.metadata.price)})</span>
+                )}
+              </li>
+            ))}
+          </ul>
+        </div>
+      )}
     </div>
   );
 };
@@ -5,9 +5,24 @@ import Image from "next/image";
 import { Wine } from "@/types";
 import WineCard from "@/components/WineCard";
 
-const getWines = async (): Promise<Wine[]> => {
+const API_BASE_URL = "http://localhost:8000";
+
+interface FacetCount {
+  value: string;
+  count: number;
+}
+
+// Fields WineCard renders. Lists leave out description unless it is asked for.
+const CARD_FIELDS = "id,name,type,varietal,region,country,vintage,description,image_url,price";
+
+// Filtering happens on the server; the page only asks for the wines it shows.
+const getWines = async (type: string): Promise<Wine[]> => {
+  const params = new URLSearchParams({ limit: "100", fields: CARD_FIELDS });
+  if (type !== "") {
+    params.append("type", type);
+  }
   try {
-    const response = await fetch("http://localhost:8000/wines/");
+    const response = await fetch(`${API_BASE_URL}/wines/?${params.toString()}`);
     if (!response.ok) {
       console.error("[BrowseWinesPage - getWines] Network response was not ok. Status:", response.status, "StatusText:", response.statusText); // Log 3 - KEEP
       throw new Error(`HTTP error! status: ${response.status}`);
@@ -20,25 +35,37 @@ const getWines = async (): Promise<Wine[]> => {
   }
 };
 
+const getTypeFacets = async (): Promise<FacetCount[]> => {
+  const response = await fetch(`${API_BASE_URL}/wines/facets`);
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  const data: { facets: Record<string, FacetCount[]> } = await response.json();
+  return data.facets.type ?? [];
+};
+
 const BrowseWinesPage: React.FC = () => {
-  const [allWines, setAllWines] = useState<Wine[]>([]);
-  const [filteredWines, setFilteredWines] = useState<Wine[]>([]);
+  const [wines, setWines] = useState<Wine[]>([]);
+  const [typeFacets, setTypeFacets] = useState<FacetCount[]>([]);
   const [typeFilter, setTypeFilter] = useState<string>("");
   const [isLoading, setIsLoading] = useState<boolean>(true);
   const [fetchError, setFetchError] = useState<string | null>(null);
 
+  useEffect(() => {
+    getTypeFacets()
+      .then(setTypeFacets)
+      .catch((error) => console.error("[BrowseWinesPage] Error fetching type facets:", error));
+  }, []);
+
   useEffect(() => {
     const performFetch = async () => {
-      if (!isLoading) {
-        setIsLoading(true);
-      }
+      setIsLoading(true);
       setFetchError(null);
 
       try {
-        const winesData = await getWines();
+        const winesData = await getWines(typeFilter);
         if (winesData) {
-          setAllWines(winesData);
-          setFilteredWines(winesData);
+          setWines(winesData);
         } else {
           console.log("[BrowseWinesPage] useEffect - winesData is null or undefined after fetch."); // Log C.2 - KEEP
           setFetchError("Received no data from server (winesData was null/undefined).");
@@ -50,44 +77,25 @@ const BrowseWinesPage: React.FC = () => {
         } else {
           setFetchError("Failed to fetch wines due to an unknown error.");
         }
-        setAllWines([]);
-        setFilteredWines([]);
+        setWines([]);
       } finally {
         setIsLoading(false);
       }
     };
 
     performFetch();
-  }, []);
+  }, [typeFilter]);
 
   const handleFilterChange = (event: React.ChangeEvent<HTMLSelectElement>) => {
     const selectedType = event.target.value;
     console.log(`[BrowseWinesPage] Filter changed. Selected type: ${selectedType}`); // Log H - KEEP
     setTypeFilter(selectedType);
-    if (selectedType === "") {
-      setFilteredWines(allWines);
-    } else {
-      setFilteredWines(
-        allWines.filter(wine => typeof wine.type === 'string' && wine.type.toLowerCase() === selectedType.toLowerCase())
-      );
-    }
   };
 
   const wineTypes = useMemo(() => {
-    const types = new Set(
-      allWines
-        .map((wine) => wine.type)
-        .filter((type): type is string => typeof type === 'string' && type.trim() !== '') // Ensure type is a non-empty string
-    );
-    return ["", ...Array.from(types)]; // Add "" for "All Types" option, ensure it's always string
-  }, [allWines]);
-
-  let winesToDisplay: Wine[] = [];
-  if (typeFilter === "") {
-    winesToDisplay = allWines;
-  } else {
-    winesToDisplay = filteredWines;
-  }
+    const types = typeFacets.map((facet) => facet.value).filter((type) => type.trim() !== "");
+    return ["", ...types]; // Add "" for "All Types" option, ensure it's always string
+  }, [typeFacets]);
 
   if (isLoading) {
     return (
@@ -111,7 +119,7 @@ const BrowseWinesPage: React.FC = () => {
     );
   }
 
-  if (!allWines || allWines.length === 0) {
+  if (typeFilter === "" && wines.length === 0) {
     return (
       <div className="container mx-auto px-4 py-8 text-center">
         <p className="text-xl text-gray-700">No wines available at the moment.</p>
@@ -148,13 +156,13 @@ const BrowseWinesPage: React.FC = () => {
         </select>
       </div>
 
-      {filteredWines.length === 0 && typeFilter !== "" ? (
+      {wines.length === 0 ? (
         <p className="text-center text-gray-600">
           No wines match the selected filter &quot;{typeFilter}&quot;.
         </p>
       ) : (
         <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-8">
-          {(typeFilter === "" ? allWines : filteredWines).map((wine) => (
+          {wines.map((wine) => (
             <WineCard key={wine.id} wine={wine} />
           ))}
         </div>
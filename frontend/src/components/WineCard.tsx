@@ -2,6 +2,7 @@
 
 import Image from "next/image";
 import { Wine } from "@/types";
+import { formatPrice } from "@/lib/format";
 
 interface WineCardProps {
   wine: Wine;
@@ -47,7 +48,7 @@ export default function WineCard({ wine }: WineCardProps) {
         )}
 
         <p className="mt-auto mb-3 text-2xl font-bold font-serif text-primary">
-          ${wine.price.toFixed(2)}
+          {formatPrice(wine.price)}
         </p>
 
         <button
@@ -0,0 +1,4 @@
+// Catalog prices are in Swiss francs; de-CH gives "CHF 24.90".
+const priceFormatter = new Intl.NumberFormat("de-CH", { style: "currency", currency: "CHF" });
+
+export const formatPrice = (price: number): string => priceFormatter.format(price);
@@ -17,4 +17,5 @@ export interface Wine {
   product_url?: string | null; // New field
   size?: string | null; // New field
   source?: string | null; // New field
+  version?: number; // Bumped on every update; send back in If-Match
 }